@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(1, os.path.join(ROOT, "code"))
+
+import resources
+import linguistic_analysis
+from prima_facie_analysis import preprocess_script
+from comparative_analysis import compare_parts, feature_matrix, visualize_comparison
+from main import analyzer_functions, legal_terms
+from synthetic import synthetic_script
+
+SCALES = (1, 10, 100, 1000)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "latest.json")
+
+def reset_peak_rss():
+    # Linux: writing 5 to clear_refs resets the VmHWM high-water mark for this process
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _status_mb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def rss_mb():
+    return _status_mb("VmRSS:")
+
+def peak_rss_mb():
+    peak = _status_mb("VmHWM:")
+    if peak is not None:
+        return peak
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def word_count(text):
+    return len(text.split())
+
+class StageRecorder:
+    """Runs benchmark stages and records wall time, peak RSS and tokens/sec for each."""
+
+    def __init__(self, include=None):
+        self.include = include
+        self.records = []
+        self.rss_resettable = reset_peak_rss()
+
+    def wanted(self, stage):
+        return not self.include or any(pattern in stage for pattern in self.include)
+
+    def run(self, scale, stage, tokens, func, *args, **kwargs):
+        if not self.wanted(stage):
+            return None
+        reset_peak_rss()
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        error = None
+        try:
+            result = func(*args, **kwargs)
+        except Exception as exc:  # recorded, so one failing stage does not end the run
+            result, error = None, f"{type(exc).__name__}: {exc}"
+        wall = time.perf_counter() - start
+        record = {
+            "scale": scale,
+            "stage": stage,
+            "wall_s": wall,
+            "peak_rss_mb": peak_rss_mb(),
+            "rss_before_mb": rss_before,
+            "tokens": tokens,
+            "tokens_per_s": tokens / wall if wall > 0 and error is None else None
+        }
+        if error:
+            record["error"] = error
+        self.records.append(record)
+        status = error or f"{wall:.3f}s, {record['peak_rss_mb']:.0f} MB, {record['tokens_per_s'] or 0:,.0f} tokens/s"
+        print(f"  {scale}x {stage}: {status}")
+        return result
+
+def bench_src(recorder, scale, script_path, tokens, output_dir):
+    text_data = recorder.run(scale, "preprocess_script", tokens, preprocess_script, script_path)
+    if text_data is None:
+        text_data = preprocess_script(script_path)
+    parts = {"part_one": text_data["part_one"], "part_two": text_data["part_two"]}
+    part_tokens = sum(word_count(text) for text in parts.values())
+
+    # Parsing is timed on its own; the analyzers then run on the parsed (in-memory) documents
+    linguistic_analysis.clear_caches()
+    recorder.run(scale, "parse", part_tokens, lambda: [linguistic_analysis.parse(text) for text in parts.values()])
+    for func in analyzer_functions:
+        args = (legal_terms,) if func is linguistic_analysis.analyze_legal_terminology else ()
+        recorder.run(scale, func.__name__, part_tokens, lambda: [func(text, *args) for text in parts.values()])
+    recorder.run(scale, "sentence_trends", part_tokens,
+                 lambda: [linguistic_analysis.sentence_trends(text) for text in parts.values()])
+    recorder.run(scale, "token_trends", part_tokens,
+                 lambda: [linguistic_analysis.token_trends(text, legal_terms) for text in parts.values()])
+
+    # compare_parts runs cold, as a fresh process would
+    linguistic_analysis.clear_caches()
+    results = recorder.run(scale, "compare_parts", part_tokens, compare_parts, text_data, legal_terms, *analyzer_functions)
+    if results is not None:
+        matrix = feature_matrix(results)
+        recorder.run(scale, "visualize_comparison", part_tokens, visualize_comparison, matrix, output_dir, legal_terms)
+    linguistic_analysis.clear_caches()
+
+def bench_preprocessing(recorder, scale, text, normalizer):
+    import data_preprocessing
+    tokens = word_count(text)
+    scenes = recorder.run(scale, "split_by_scene", tokens, data_preprocessing.split_by_scene, text)
+    if scenes is None:
+        return
+    parts = data_preprocessing.split_into_parts(scenes)
+    corpora = recorder.run(scale, "build_corpora", tokens, data_preprocessing.build_corpora, parts, set(legal_terms))
+    if corpora is None:
+        return
+    sentences = corpora["legal_discourse"] + corpora["trauma_narrative"]
+    sentence_tokens = sum(word_count(sentence["text"]) for sentence in sentences)
+    recorder.run(scale, "normalize_text", sentence_tokens, data_preprocessing.normalize_text,
+                 sentences, resources.get("stopwords"), nlp=normalizer())
+
+def check_regressions(records, baseline, tolerance, min_delta):
+    """Returns messages for stages that fail, or are slower (or larger) than baseline * (1 + tolerance)."""
+    regressions = []
+    for record in records:
+        reference = baseline.get(f"{record['scale']}x/{record['stage']}")
+        # A failing stage is never timed, so it fails the check even when the baseline failed too
+        if "error" in record:
+            state = "still fails" if reference and "error" in reference else "fails"
+            regressions.append(f"{record['scale']}x/{record['stage']}: {state} ({record['error']})")
+            continue
+        if not reference:
+            continue
+        for field, unit, floor in (("wall_s", "s", min_delta), ("peak_rss_mb", " MB", 0)):
+            before, after = reference.get(field), record[field]
+            if before is None:
+                continue
+            if after > before * (1 + tolerance) and after - before > floor:
+                regressions.append(f"{record['scale']}x/{record['stage']}: {field} {before:.3f}{unit} -> {after:.3f}{unit}")
+    return regressions
+
+def save_json(data, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline on synthetic scripts")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES),
+                        help="Script sizes as multiples of the play (default: 1 10 100 1000)")
+    parser.add_argument("--stages", nargs="+", help="Only run stages whose name contains one of these strings")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the results JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--require-baseline", action="store_true",
+                        help="Fail (exit 1) when the baseline file is missing instead of skipping the comparison")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--min-delta", type=float, default=0.05,
+                        help="Ignore wall-time regressions smaller than this many seconds")
+    parser.add_argument("--skip-preprocessing", action="store_true",
+                        help="Skip the code/data_preprocessing.py stages")
+    args = parser.parse_args()
+    if args.require_baseline and not args.update_baseline and not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; record one with --update-baseline")
+        return 1
+
+    recorder = StageRecorder(args.stages)
+    startup = resources.warm_up("spacy", "vader", "stopwords", "sent_tokenize")
+    normalizer = None
+    if not args.skip_preprocessing:
+        from data_preprocessing import load_normalizer
+        start = time.perf_counter()
+        normalizer_nlp = load_normalizer()
+        startup["normalizer"] = time.perf_counter() - start
+        normalizer = lambda: normalizer_nlp
+
+    with tempfile.TemporaryDirectory(prefix="prima-facie-bench-") as workdir:
+        for scale in args.scales:
+            print(f"Scale {scale}x")
+            script_path = os.path.join(workdir, f"script_{scale}x.txt")
+            script = synthetic_script(scale)
+            with open(script_path, "w", encoding="utf-8") as f:
+                f.write(script)
+            bench_src(recorder, scale, script_path, word_count(script), os.path.join(workdir, f"figures_{scale}x"))
+            del script
+            if normalizer:
+                bench_preprocessing(recorder, scale, synthetic_script(scale, scene_numbers="words"), normalizer)
+            os.remove(script_path)
+
+    run = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "peak_rss_per_stage": recorder.rss_resettable,
+        "startup_s": startup,
+        "stages": recorder.records
+    }
+    save_json(run, args.output)
+    print(f"Results saved to {args.output}")
+
+    if args.update_baseline:
+        save_json({"created": run["created"], "platform": run["platform"],
+                   "stages": {f"{r['scale']}x/{r['stage']}": r for r in recorder.records}}, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one "
+              f"(--require-baseline makes this an error)")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["stages"]
+    regressions = check_regressions(recorder.records, baseline, args.tolerance, args.min_delta)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if regressions:
+        return 1
+    print("No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import numpy as np
+
+# Roughly the size of the real play (PART ONE: scenes 1-7, PART TWO: scenes 8-18)
+BASE_WORDS = 14_000
+SCENE_COUNT = 18
+PART_ONE_SCENES = 7
+VOCAB_SIZE = 4_000
+
+SCENE_WORDS = [
+    "One", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine", "Ten",
+    "Eleven", "Twelve", "Thirteen", "Fourteen", "Fifteen", "Sixteen", "Seventeen", "Eighteen"
+]
+
+COMMON_WORDS = (
+    "i you the and it to a of that is in my me was what not this for on we he "
+    "she they be have do but no yes just know like so all with at there can then "
+    "now about would said go get out up could when one because think want"
+).split()
+
+LEGAL_WORDS = (
+    "evidence testimony witness cross-examination prosecution defense objection alleged "
+    "victim accused court judge jury consent credibility hearsay sworn verdict counsel "
+    "defendant complainant acquittal precedent jurisdiction law trial case statement police"
+).split()
+
+SENSORY_WORDS = (
+    "see hear feel smell taste touch saw heard felt body pain numb cold dark "
+    "breath hands skin shaking blood voice"
+).split()
+
+# (ending, probability) -- ellipses and dashes feed the disruption markers
+ENDINGS = ((".", 0.62), ("?", 0.16), ("!", 0.08), ("...", 0.08), (" —", 0.06))
+
+def build_vocabulary(size=VOCAB_SIZE, seed=0):
+    """Real words first (most frequent), then deterministic pseudo-words up to size."""
+    words = list(dict.fromkeys(COMMON_WORDS + LEGAL_WORDS + SENSORY_WORDS))
+    rng = np.random.default_rng(seed)
+    syllables = [c + v for c in "bcdfghklmnprstvw" for v in "aeiou"]
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(syllables, size=rng.integers(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return np.array(words, dtype=object)
+
+def _scene_text(rng, vocab, weights, n_words):
+    ids = rng.choice(len(vocab), size=n_words, p=weights)
+    lengths = rng.integers(3, 18, size=n_words // 3 + 1)
+    bounds = np.cumsum(lengths)
+    bounds = bounds[bounds < n_words]
+    endings = rng.choice(len(ENDINGS), size=len(bounds) + 1, p=[p for _, p in ENDINGS])
+    sentences = []
+    for words, ending in zip(np.split(vocab[ids], bounds), endings):
+        if len(words):
+            sentences.append(" ".join(words).capitalize() + ENDINGS[ending][0])
+    return " ".join(sentences)
+
+def synthetic_script(scale=1, seed=0, scene_numbers="digits"):
+    """Generates a script with PART ONE / PART TWO and Scene markers, scale times the play's size.
+
+    scene_numbers="digits" writes "Scene 1" headers (src/ pipeline); "words" writes
+    "Scene One" headers, as split_by_scene in code/data_preprocessing.py expects.
+    """
+    rng = np.random.default_rng(seed)
+    vocab = build_vocabulary(seed=seed)
+    # Zipf-like word frequencies
+    weights = 1.0 / np.arange(1, len(vocab) + 1)
+    weights /= weights.sum()
+    words_per_scene = max(BASE_WORDS * scale // SCENE_COUNT, 1)
+    lines = ["PART ONE"]
+    for number in range(1, SCENE_COUNT + 1):
+        if number == PART_ONE_SCENES + 1:
+            lines.append("PART TWO")
+        lines.append(f"Scene {number if scene_numbers == 'digits' else SCENE_WORDS[number - 1]}")
+        lines.append(_scene_text(rng, vocab, weights, words_per_scene))
+    return "\n".join(lines) + "\n"
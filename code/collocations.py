@@ -0,0 +1,127 @@
+# collocations.py
+# 基于 NumPy 的搭配词计算：由整数词 id 统计二元组 / 窗口内跳词对，过滤低频后一次性向量化计算 PMI、LLR 和 t 值，用 argpartition 取前 k 个
+
+import numpy as np
+
+MEASURES = ("pmi", "llr", "t_score")
+
+# 与 nltk.metrics.association 中的平滑常数一致
+_SMALL = 1e-20
+
+
+def encode_tokens(words):
+    """
+    将词列表编码为整数 id
+    :param words: 词列表
+    :return: (int64 id 数组, 按字典序排列的词表)
+    """
+    vocab, ids = np.unique(np.array(words, dtype=str), return_inverse=True)
+    return ids.astype(np.int64), vocab.tolist()
+
+
+def pair_counts(token_ids, window=2, offsets=None):
+    """
+    统计窗口内的有序词对：w2 位于 w1 之后 1 到 window - 1 个位置（window=2 即相邻二元组）
+    :param token_ids: 整数词 id 序列
+    :param window: 窗口大小
+    :param offsets: 句子偏移（第 i 句为 token_ids[offsets[i]:offsets[i + 1]]）；给出时词对不跨句
+    :return: (w1 数组, w2 数组, 出现次数数组)
+    """
+    token_ids = np.asarray(token_ids, dtype=np.int64)
+    if window < 2:
+        raise ValueError("window 至少为 2")
+    vocab_size = int(token_ids.max()) + 1 if len(token_ids) else 1
+    sentence_of = None
+    if offsets is not None:
+        offsets = np.asarray(offsets, dtype=np.int64)
+        sentence_of = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    keys = []
+    for distance in range(1, window):
+        left, right = token_ids[:-distance], token_ids[distance:]
+        if sentence_of is not None:
+            same = sentence_of[:-distance] == sentence_of[distance:]
+            left, right = left[same], right[same]
+        # 词对编码为一个 int64 键：w1 * V + w2
+        keys.append(left * vocab_size + right)
+    keys, counts = np.unique(np.concatenate(keys), return_counts=True)
+    return keys // vocab_size, keys % vocab_size, counts
+
+
+def score_pairs(token_ids, window=2, min_freq=1, offsets=None):
+    """
+    统计词对并计算 PMI、对数似然比和 t 值（公式与 nltk BigramAssocMeasures 相同，窗口计数按 1/(window-1) 缩放）
+    :param token_ids: 整数词 id 序列
+    :param window: 窗口大小
+    :param min_freq: 词对的最低出现次数，低于该值的词对不参与计算
+    :param offsets: 句子偏移，给出时词对不跨句
+    :return: 字典，包含 w1、w2、count 以及 MEASURES 中各指标的数组
+    """
+    token_ids = np.asarray(token_ids, dtype=np.int64)
+    w1, w2, counts = pair_counts(token_ids, window, offsets)
+    keep = counts >= min_freq
+    w1, w2, counts = w1[keep], w2[keep], counts[keep]
+
+    unigram = np.bincount(token_ids).astype(np.float64)
+    n_all = float(len(token_ids))
+    n_ii = counts / (window - 1.0)
+    n_ix = unigram[w1]
+    n_xi = unigram[w2]
+
+    pmi = np.log2(n_ii * n_all) - np.log2(n_ix * n_xi)
+    t_score = (n_ii - n_ix * n_xi / n_all) / np.sqrt(n_ii + _SMALL)
+
+    # 2×2 列联表（顺序与 nltk 相同：n_ii, n_oi, n_io, n_oo）及其期望值
+    n_oi = np.maximum(n_xi - n_ii, 0)
+    n_io = np.maximum(n_ix - n_ii, 0)
+    n_oo = np.maximum(n_all - n_ii - n_oi - n_io, 0)
+    observed = np.stack([n_ii, n_oi, n_io, n_oo])
+    total = observed.sum(axis=0)
+    expected = np.stack([
+        (observed[i] + observed[i ^ 1]) * (observed[i] + observed[i ^ 2]) / total for i in range(4)
+    ])
+    llr = 2 * np.sum(observed * np.log(observed / (expected + _SMALL) + _SMALL), axis=0)
+
+    return {"w1": w1, "w2": w2, "count": counts, "pmi": pmi, "llr": llr, "t_score": t_score}
+
+
+def top_k(scores, k, tiebreak=()):
+    """
+    取分数最高的 k 个下标：先用 argpartition 选出候选，只对候选排序
+    :param scores: 分数数组
+    :param k: 数量
+    :param tiebreak: 同分时依次比较的键数组（升序）
+    :return: 按分数降序排列的下标数组
+    """
+    if k <= 0 or len(scores) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        # 保留所有与第 k 名同分的候选，保证同分时的取舍与完整排序一致
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(len(scores))
+    keys = [key[candidates] for key in reversed(tiebreak)] + [-scores[candidates]]
+    return candidates[np.lexsort(keys)][:k]
+
+
+def top_collocations(token_ids, vocab, measure="pmi", top_n=15, window=2, min_freq=1, offsets=None):
+    """
+    返回得分最高的搭配词对，同分时按词对的字典序排列（与 nltk score_ngrams 一致）
+    :param token_ids: 整数词 id 序列
+    :param vocab: 词表（id -> 词）
+    :param measure: "pmi"、"llr" 或 "t_score"
+    :param top_n: 返回数量
+    :param window: 窗口大小
+    :param min_freq: 词对的最低出现次数
+    :param offsets: 句子偏移，给出时词对不跨句
+    :return: [((w1, w2), 分数), ...]
+    """
+    if measure not in MEASURES:
+        raise ValueError(f"未知的搭配指标: {measure}")
+    if len(token_ids) < 2:
+        return []
+    scored = score_pairs(token_ids, window, min_freq, offsets)
+    rank = np.empty(len(vocab), dtype=np.int64)
+    rank[np.argsort(np.array(vocab, dtype=object))] = np.arange(len(vocab))
+    order = top_k(scored[measure], top_n, tiebreak=(rank[scored["w1"]], rank[scored["w2"]]))
+    return [((vocab[scored["w1"][i]], vocab[scored["w2"][i]]), float(scored[measure][i])) for i in order]
@@ -0,0 +1,247 @@
+# concordance.py
+# 位置倒排索引与 KWIC（上下文关键词）检索：每个词以及每个多词法律术语都有一条倒排列表（场景, 句子, 词位置, 字符偏移, 长度），
+# 以 .npy 文件保存并以内存映射方式打开，查询和按场景计数都只读倒排列表，不再重新扫描文本
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from lexicon_matcher import TOKEN_PATTERN, LexiconMatcher, tokenize_term
+
+POSTING_FIELDS = ("scene", "sentence", "position", "offset", "length")
+POSTING_DTYPES = {"scene": np.int32, "sentence": np.int32, "position": np.int64, "offset": np.int64, "length": np.int32}
+SCENE_SEPARATOR = "\n\n"
+
+
+def term_key(term):
+    """查询词和索引词条统一按 TOKEN_PATTERN 切分、小写，多词之间用单个空格连接"""
+    return " ".join(tokenize_term(term))
+
+
+def sentence_starts(text, sentences):
+    """
+    在 text 中依次定位每个句子的起始字符偏移
+    :param text: 场景文本
+    :param sentences: 按顺序排列的句子列表
+    :return: 起始偏移列表（找不到的句子沿用当前位置）
+    """
+    starts, position = [], 0
+    for sentence in sentences:
+        found = text.find(sentence, position)
+        if found < 0:
+            starts.append(position)
+            continue
+        starts.append(found)
+        position = found + len(sentence)
+    return starts
+
+
+class ConcordanceIndex:
+    """
+    位置倒排索引：词条表有序排列，第 i 个词条的倒排记录位于 postings[field][term_offsets[i]:term_offsets[i + 1]]，
+    同一词条内按词位置排序
+    :param text: 各场景文本用 SCENE_SEPARATOR 拼接后的全文（字符偏移指向它）
+    :param terms: 有序词条数组（单词和多词法律术语）
+    :param term_offsets: 每个词条倒排列表的起始位置（长度为词条数 + 1）
+    :param postings: {字段名: 数组}，字段见 POSTING_FIELDS
+    :param scenes: 场景元数据列表（title、scene_number、start、end）
+    :param legal_terms: 建索引时使用的法律术语
+    """
+
+    def __init__(self, text, terms, term_offsets, postings, scenes, legal_terms=()):
+        self.text = text
+        self.terms = terms
+        self.term_offsets = term_offsets
+        self.postings = postings
+        self.scenes = scenes
+        self.legal_terms = list(legal_terms)
+
+    @property
+    def size(self):
+        return len(self.postings["position"])
+
+    @classmethod
+    def build(cls, scenes, legal_terms=(), split_sentences=None):
+        """
+        由 split_by_scene 的结果构建索引
+        :param scenes: [{"title", "content", "scene_number"}, ...]
+        :param legal_terms: 法律术语；多词术语（如 "prima facie"）作为独立词条建立倒排列表
+        :param split_sentences: 分句函数；为空时每个场景视为一个句子
+        """
+        phrases = sorted({term_key(term) for term in legal_terms if len(tokenize_term(term)) > 1})
+        matcher = LexiconMatcher(phrases)
+        contents, scene_meta = [], []
+        keys, columns = [], {field: [] for field in POSTING_FIELDS}
+        base = position_base = 0
+        for scene_index, scene in enumerate(scenes):
+            content = scene["content"]
+            matches = list(TOKEN_PATTERN.finditer(content.lower()))
+            token_starts = np.array([match.start() for match in matches], dtype=np.int64)
+            sentences = split_sentences(content) if split_sentences else [content]
+            first_chars = np.array(sentence_starts(content, sentences), dtype=np.int64)
+
+            def sentence_of(char_offsets):
+                return np.maximum(np.searchsorted(first_chars, char_offsets, side="right") - 1, 0)
+
+            keys.extend(match.group() for match in matches)
+            columns["scene"].append(np.full(len(matches), scene_index))
+            columns["sentence"].append(sentence_of(token_starts))
+            columns["position"].append(position_base + np.arange(len(matches)))
+            columns["offset"].append(base + token_starts)
+            columns["length"].append(np.array([match.end() - match.start() for match in matches], dtype=np.int64))
+
+            # 多词术语：倒排记录指向术语的第一个词
+            hits = list(matcher.finditer(content))
+            hit_starts = np.array([start for _, start, _ in hits], dtype=np.int64)
+            keys.extend(term for term, _, _ in hits)
+            columns["scene"].append(np.full(len(hits), scene_index))
+            columns["sentence"].append(sentence_of(hit_starts))
+            columns["position"].append(position_base + np.searchsorted(token_starts, hit_starts))
+            columns["offset"].append(base + hit_starts)
+            columns["length"].append(np.array([end - start for _, start, end in hits], dtype=np.int64))
+
+            scene_meta.append({"title": scene.get("title", f"Scene {scene_index + 1}"),
+                               "scene_number": scene.get("scene_number", scene_index + 1),
+                               "start": base, "end": base + len(content)})
+            contents.append(content)
+            base += len(content) + len(SCENE_SEPARATOR)
+            position_base += len(matches)
+
+        terms = np.array(sorted(set(keys) | set(phrases)), dtype=str)
+        term_ids = np.searchsorted(terms, np.array(keys, dtype=str)) if keys else np.zeros(0, dtype=np.int64)
+        postings = {field: np.concatenate(columns[field]).astype(POSTING_DTYPES[field]) if columns[field]
+                    else np.zeros(0, dtype=POSTING_DTYPES[field]) for field in POSTING_FIELDS}
+        order = np.lexsort((postings["position"], term_ids))
+        postings = {field: values[order] for field, values in postings.items()}
+        term_offsets = np.concatenate(([0], np.cumsum(np.bincount(term_ids, minlength=len(terms))))).astype(np.int64)
+        return cls(SCENE_SEPARATOR.join(contents), terms, term_offsets, postings, scene_meta, legal_terms)
+
+    def save(self, directory):
+        """保存为目录：每个倒排字段一个 .npy 文件，外加词条表、全文和元数据（先写临时目录再替换）"""
+        tmp_directory = f"{directory}.{os.getpid()}.tmp"
+        os.makedirs(tmp_directory, exist_ok=True)
+        np.save(os.path.join(tmp_directory, "terms.npy"), self.terms)
+        np.save(os.path.join(tmp_directory, "term_offsets.npy"), self.term_offsets)
+        for field in POSTING_FIELDS:
+            np.save(os.path.join(tmp_directory, f"{field}.npy"), self.postings[field])
+        with open(os.path.join(tmp_directory, "text.txt"), "w", encoding="utf-8", newline="") as file:
+            file.write(self.text)
+        with open(os.path.join(tmp_directory, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump({"scenes": self.scenes, "legal_terms": sorted(self.legal_terms)}, file, ensure_ascii=False, indent=2)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.replace(tmp_directory, directory)
+
+    @classmethod
+    def load(cls, directory):
+        """以内存映射方式打开索引，倒排列表只在查询时按需读入"""
+        def array(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        with open(os.path.join(directory, "text.txt"), "r", encoding="utf-8", newline="") as file:
+            text = file.read()
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        return cls(text, array("terms"), array("term_offsets"), {field: array(field) for field in POSTING_FIELDS},
+                   meta["scenes"], meta["legal_terms"])
+
+    def term_id(self, term):
+        """词条编号（二分查找有序词条表），不存在时返回 None"""
+        key = term_key(term)
+        i = int(np.searchsorted(self.terms, key))
+        return i if i < len(self.terms) and self.terms[i] == key else None
+
+    def _term_postings(self, term_id):
+        if term_id is None:
+            return {field: np.zeros(0, dtype=POSTING_DTYPES[field]) for field in POSTING_FIELDS}
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        return {field: np.asarray(values[start:end]) for field, values in self.postings.items()}
+
+    def lookup(self, query):
+        """
+        返回查询的倒排记录：单词或已索引的多词术语直接读取；其他短语由各词的位置列表求交得到
+        :param query: 查询词或短语
+        :return: {字段名: 数组}，按词位置排序
+        """
+        tokens = tokenize_term(query)
+        term_id = self.term_id(query)
+        if term_id is not None or len(tokens) <= 1:
+            return self._term_postings(term_id)
+        first = self._term_postings(self.term_id(tokens[0]))
+        keep = np.ones(len(first["position"]), dtype=bool)
+        for distance, token in enumerate(tokens[1:], start=1):
+            keep &= np.isin(first["position"] + distance, self._term_postings(self.term_id(token))["position"])
+        result = {field: values[keep] for field, values in first.items()}
+        # 短语长度 = 最后一个词的结束偏移 - 第一个词的起始偏移；跨场景的匹配丢弃
+        last = self._term_postings(self.term_id(tokens[-1]))
+        j = np.searchsorted(last["position"], result["position"] + len(tokens) - 1)
+        result["length"] = (last["offset"][j] + last["length"][j] - result["offset"]).astype(np.int32)
+        same_scene = last["scene"][j] == result["scene"]
+        return {field: values[same_scene] for field, values in result.items()}
+
+    def scene_counts(self, query):
+        """按场景统计命中次数（直接对倒排列表计数）：{场景标题: 次数}"""
+        counts = np.bincount(self.lookup(query)["scene"], minlength=len(self.scenes))
+        return {scene["title"]: int(count) for scene, count in zip(self.scenes, counts)}
+
+    def kwic(self, query, width=40, scenes=None, limit=None):
+        """
+        上下文关键词检索
+        :param query: 查询词或短语
+        :param width: 左右上下文的字符数
+        :param scenes: 只返回这些场景编号（scene_number）中的结果
+        :param limit: 最多返回的条数
+        :return: [{"scene", "title", "sentence", "offset", "left", "match", "right"}, ...]
+        """
+        postings = self.lookup(query)
+        if scenes is not None:
+            wanted = [i for i, scene in enumerate(self.scenes) if scene["scene_number"] in set(scenes)]
+            postings = {field: values[np.isin(postings["scene"], wanted)] for field, values in postings.items()}
+        results = []
+        for scene, sentence, offset, length in zip(postings["scene"][:limit].tolist(), postings["sentence"][:limit].tolist(),
+                                                   postings["offset"][:limit].tolist(), postings["length"][:limit].tolist()):
+            bounds = self.scenes[scene]
+            results.append({
+                "scene": bounds["scene_number"],
+                "title": bounds["title"],
+                "sentence": sentence,
+                "offset": offset,
+                "left": " ".join(self.text[max(bounds["start"], offset - width):offset].split()),
+                "match": self.text[offset:offset + length],
+                "right": " ".join(self.text[offset + length:min(bounds["end"], offset + length + width)].split())
+            })
+        return results
+
+
+def main():
+    from config import config
+    parser = argparse.ArgumentParser(description="在位置倒排索引中检索词或短语并显示上下文（KWIC）")
+    parser.add_argument("queries", nargs="+", help="查询词或短语，例如 consent \"prima facie\"")
+    parser.add_argument("--index", default=config.CONCORDANCE_PATH, help="索引目录（由 data_preprocessing.py 生成）")
+    parser.add_argument("--width", type=int, default=40, help="左右上下文的字符数")
+    parser.add_argument("--scene", type=int, nargs="+", help="只显示这些场景编号中的结果")
+    parser.add_argument("--limit", type=int, default=None, help="每个查询最多显示的条数")
+    parser.add_argument("--counts", action="store_true", help="只显示各场景的命中次数")
+    args = parser.parse_args()
+
+    index = ConcordanceIndex.load(args.index)
+    for query in args.queries:
+        if args.counts:
+            counts = index.scene_counts(query)
+            print(f"{query}: {sum(counts.values())} 次")
+            for title, count in counts.items():
+                if count:
+                    print(f"  {title}: {count}")
+            continue
+        results = index.kwic(query, args.width, args.scene, args.limit)
+        print(f"== {query}: {len(results)} 条 ==")
+        for hit in results:
+            print(f"{hit['title']:>16} s{hit['sentence']:<4} {hit['left']:>{args.width}} [{hit['match']}] {hit['right']}")
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding="utf-8")
+    main()
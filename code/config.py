@@ -15,12 +15,46 @@ class Config:
     DEFAULT_NGRAM = 2                                       # 默认 N-Gram 分析的 n 值
     KEYWORD_THRESHOLD = 5                                   # 关键词提取的频率阈值
     TOP_WORDS_COUNT = 10                                    # 词频统计中返回的高频词数量
+    COLLOCATION_MIN_FREQ = 3                                # 搭配词对的最低出现次数（过滤只出现一两次的偶然词对）
+    COLLOCATION_WINDOW = 2                                  # 搭配窗口大小（2 为相邻二元组，更大时统计跳词对）
+
+    # PDF 提取参数
+    PDF_WORKERS = 1                                         # 并行提取 PDF 的进程数（1 表示顺序提取）
+    PDF_PAGES_PER_CHUNK = 16                                # 每个提取任务包含的页数
+
+    # 标准化（spaCy nlp.pipe）参数
+    SPACY_MODEL = "en_core_web_sm"                          # 词形还原使用的 spaCy 模型
+    NORMALIZE_BATCH_SIZE = 256                              # nlp.pipe 每批处理的句子数
+    NORMALIZE_N_PROCESS = 1                                 # nlp.pipe 使用的进程数（大语料可调高）
 
     # 日志配置
     LOG_LEVEL = "INFO"                                      # 日志记录级别 ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
 
     # 情感分析相关
     SENTIMENT_MODEL = "TextBlob"                            # 情感分析模型名称，可以切换为其他模型
+    SENTIMENT_CACHE_PATH = "./processed_data/sentiment_cache.sqlite"  # 句子情感结果缓存（按句子哈希）
+    SENTIMENT_WORKERS = 1                                   # 计算未缓存句子时使用的进程数
+
+    # 句向量（KeyBERT / BERTopic 共用）
+    EMBEDDING_MODEL = "all-MiniLM-L6-v2"                    # sentence-transformers 模型名称
+    EMBEDDING_STORE_PATH = "./processed_data/embeddings"    # 持久化句向量库目录
+
+    # 主题建模（gensim LdaMulticore）
+    TOPIC_DOCUMENT_UNIT = "sentence"                        # 使用流水线文档-词矩阵时的文档单位："sentence" 或 "scene"
+    TOPIC_CHUNK_WORDS = 100                                 # 没有文档-词矩阵时，词列表（processed_data.csv）按每多少个连续词切分为一个文档
+    TOPIC_PASSES = 15                                       # 训练轮数
+    TOPIC_WORKERS = None                                    # LdaMulticore 工作进程数（None 表示 CPU 核数 - 1）
+    TOPIC_RANDOM_STATE = 42                                 # 固定随机种子，保证缓存的模型可复现
+    TOPIC_CACHE_PATH = "./processed_data/topic_models"      # MmCorpus 语料与训练好的模型缓存目录
+
+    # 位置倒排索引（KWIC 检索）
+    CONCORDANCE_PATH = "./processed_data/concordance"       # 倒排索引目录（内存映射的 .npy 倒排列表）
+
+    # 绘图
+    MAKE_PLOTS = True                                       # 是否生成图表（批量运行时可设为 False，或在命令行加 --no-plots）
+    PLOT_WORKERS = 1                                        # 并行绘图的进程数（1 表示顺序绘制）
+    TREND_WINDOW = 25                                       # 情感趋势图的滑动窗口大小（句子数）
+    TREND_STRIDE = 5                                        # 滑动窗口的步长（句子数）
 
     # 数据库配置（如果需要）
     # DB_HOST = "localhost"
@@ -0,0 +1,175 @@
+# corpus_matrix.py
+# 语料库的稀疏“文档-词”矩阵（句子 × 词表，SciPy CSR）：只构建一次，词频、高频词、按场景/部分聚合以及 gensim 语料都由它通过稀疏运算得到
+
+import json
+import numpy as np
+from scipy import sparse
+
+
+class DocumentTermMatrix:
+    """
+    句子 × 词表的计数矩阵，同时保留按句子拼接的词 id 序列，供搭配词等依赖词序的统计使用
+    :param token_ids: 所有句子的词 id 依次拼接而成的 int32 数组
+    :param offsets: 第 i 个句子的词位于 token_ids[offsets[i]:offsets[i + 1]]
+    :param vocab: 词表（按首次出现的顺序）
+    :param labels: 每个句子的元数据字典（如 part、scene、corpus），用于筛选和聚合
+    """
+
+    def __init__(self, token_ids, offsets, vocab, labels=None):
+        self.token_ids = np.asarray(token_ids, dtype=np.int32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.vocab = list(vocab)
+        self.vocab_index = {word: i for i, word in enumerate(self.vocab)}
+        self.labels = labels if labels is not None else [{} for _ in range(len(self.offsets) - 1)]
+        # 计数矩阵的 indptr 就是 offsets，构造时重复的 (行, 词) 会被合并
+        ones = np.ones(len(self.token_ids), dtype=np.int64)
+        self.matrix = sparse.csr_matrix((ones, self.token_ids.copy(), self.offsets.copy()),
+                                        shape=(len(self.offsets) - 1, len(self.vocab)))
+        self.matrix.sum_duplicates()
+
+    @classmethod
+    def from_texts(cls, texts, labels=None):
+        """
+        由空格分隔的标准化句子构建矩阵（对文本只做一次切分）
+        :param texts: 句子字符串列表
+        :param labels: 与句子一一对应的元数据字典列表
+        """
+        vocab_index = {}
+        ids = []
+        offsets = [0]
+        for text in texts:
+            for word in text.split():
+                ids.append(vocab_index.setdefault(word, len(vocab_index)))
+            offsets.append(len(ids))
+        return cls(ids, offsets, vocab_index, labels)
+
+    @classmethod
+    def from_tokens(cls, documents, labels=None):
+        """由已经切分好的词列表构建矩阵"""
+        return cls.from_texts([" ".join(words) for words in documents], labels)
+
+    @classmethod
+    def from_normalized_corpora(cls, normalized_corpora):
+        """
+        由 normalized_corpora.json 的内容构建矩阵，每个句子标注 corpus、part 和 scene（即 source 字段）
+        :param normalized_corpora: {语料库名称: [{"text", "part", "source", ...}, ...]}
+        """
+        texts, labels = [], []
+        for corpus_name, corpus in normalized_corpora.items():
+            for item in corpus:
+                texts.append(item["text"])
+                labels.append({"corpus": corpus_name, "part": item.get("part"), "scene": item.get("source")})
+        return cls.from_texts(texts, labels)
+
+    @classmethod
+    def from_normalized_sentences(cls, normalized_sentences):
+        """
+        由 normalized_sentences.json 的内容构建矩阵，每个句子标注 part 和 scene（场景按标题排序）
+        :param normalized_sentences: {部分名称: {场景标题: [句子, ...]}}
+        """
+        texts, labels = [], []
+        for part_name, scenes in normalized_sentences.items():
+            for scene_title in sorted(scenes.keys()):
+                for sentence in scenes[scene_title]:
+                    texts.append(sentence)
+                    labels.append({"part": part_name, "scene": scene_title})
+        return cls.from_texts(texts, labels)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def rows(self, **criteria):
+        """
+        返回元数据满足全部条件的句子行号，如 rows(part="Part One")
+        :return: 升序的行号数组
+        """
+        return np.array([i for i, label in enumerate(self.labels)
+                         if all(label.get(key) == value for key, value in criteria.items())], dtype=np.int64)
+
+    def _select(self, rows):
+        return self.matrix if rows is None else self.matrix[rows]
+
+    def tokens(self, rows=None):
+        """返回所选句子按顺序拼接的词 id 序列"""
+        if rows is None:
+            return self.token_ids
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        # 每个位置 = 所在句子的起点 + 句内偏移
+        within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return self.token_ids[np.repeat(starts, lengths) + within]
+
+    def term_counts(self, rows=None):
+        """
+        每个词在所选句子中的出现次数
+        :param rows: 行号数组，为空表示全部句子
+        :return: 长度为词表大小的 int64 数组
+        """
+        return np.asarray(self._select(rows).sum(axis=0)).ravel()
+
+    def most_common(self, n=None, rows=None):
+        """
+        出现次数最多的 n 个词；次数相同时按在所选句子中首次出现的先后排序（与 Counter.most_common 一致）
+        :return: [(词, 次数), ...]
+        """
+        counts = self.term_counts(rows)
+        present = np.flatnonzero(counts)
+        tokens = self.tokens(rows)
+        first_seen = np.empty(len(self.vocab), dtype=np.int64)
+        unique_ids, first_index = np.unique(tokens, return_index=True)
+        first_seen[unique_ids] = first_index
+        order = present[np.lexsort((first_seen[present], -counts[present]))]
+        if n is not None:
+            order = order[:n]
+        return [(self.vocab[i], int(counts[i])) for i in order]
+
+    def aggregate(self, key):
+        """
+        按元数据字段把句子行求和，得到“组 × 词表”矩阵（如每个场景或每个部分一行）
+        :param key: 元数据字段名，如 "part"；也可以是字段名元组，如 ("part", "scene")
+        :return: (组名列表, CSR 矩阵)
+        """
+        if isinstance(key, str):
+            group_of = [label.get(key) for label in self.labels]
+        else:
+            group_of = [tuple(label.get(k) for k in key) for label in self.labels]
+        groups = list(dict.fromkeys(group_of))
+        group_index = {group: i for i, group in enumerate(groups)}
+        membership = sparse.csr_matrix(
+            (np.ones(len(self.labels), dtype=np.int64),
+             ([group_index[group] for group in group_of], np.arange(len(self.labels)))),
+            shape=(len(groups), len(self.labels)))
+        return groups, (membership @ self.matrix).tocsr()
+
+    def stats(self, rows=None, top_n=20):
+        """
+        句子数、词数、词表大小和高频词
+        :return: 与 get_corpus_stats 相同结构的字典
+        """
+        counts = self.term_counts(rows)
+        return {
+            "sentence_count": len(self) if rows is None else len(rows),
+            "word_count": int(counts.sum()),
+            "unique_words": int(np.count_nonzero(counts)),
+            "top_words": self.most_common(top_n, rows)
+        }
+
+    def gensim_corpus(self, rows=None):
+        """
+        转换为 gensim 的词袋语料和 id2word 映射，不再重复切分文本
+        :return: (语料, {词 id: 词})
+        """
+        from gensim.matutils import Sparse2Corpus
+        return Sparse2Corpus(self._select(rows), documents_columns=False), dict(enumerate(self.vocab))
+
+    def save(self, path):
+        """保存为 .npz 文件（词 id 序列、句子偏移、词表和元数据）"""
+        with open(path, "wb") as file:
+            np.savez(file, token_ids=self.token_ids, offsets=self.offsets,
+                     vocab=np.array(self.vocab, dtype=str), labels=np.array(json.dumps(self.labels, ensure_ascii=False)))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["token_ids"], data["offsets"], data["vocab"].tolist(), json.loads(str(data["labels"])))
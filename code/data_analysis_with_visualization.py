@@ -1,19 +1,13 @@
 import pandas as pd
-import nltk
 from nltk.probability import FreqDist
 from nltk.util import ngrams
-from nltk.collocations import BigramCollocationFinder
-from nltk.metrics import BigramAssocMeasures
 from textblob import TextBlob
 import matplotlib.pyplot as plt
 from wordcloud import WordCloud
 import networkx as nx
-from gensim import corpora, models
 from config import config
-
-# 下载 NLTK 必需的数据包
-nltk.download('punkt')
-nltk.download('stopwords')
+from collocations import encode_tokens, top_collocations
+from topic_stage import topic_matrix, train_topic_model
 
 # 读取清洗后的 CSV 文件
 def load_processed_data(csv_file):
@@ -84,9 +78,9 @@ def ngram_analysis(words, n=2, top_n=10):
     return n_grams
 
 # 4. 共现分析 (Collocation Analysis) + 可视化
-def collocation_analysis(words, top_n=10):
-    bigram_finder = BigramCollocationFinder.from_words(words)
-    bigrams = bigram_finder.nbest(BigramAssocMeasures.likelihood_ratio, top_n)
+def collocation_analysis(words, top_n=10, min_freq=1):
+    token_ids, vocab = encode_tokens(words)
+    bigrams = [pair for pair, score in top_collocations(token_ids, vocab, "llr", top_n, min_freq=min_freq)]
     
     print("\n(Collocation Analysis):")
     print(bigrams)
@@ -124,12 +118,12 @@ def sentiment_analysis(text):
     return sentiment
 
 # 6. 高级分析：主题建模 (Topic Modeling) + 可视化
-def topic_modeling(words, num_topics=3, num_words=5):
-    dictionary = corpora.Dictionary([words])
-    corpus = [dictionary.doc2bow(words)]
-    lda_model = models.LdaModel(corpus, num_topics=num_topics, id2word=dictionary, passes=15)
+def topic_modeling(words, num_topics=3, num_words=5, chunk_words=config.TOPIC_CHUNK_WORDS):
+    # 优先以预处理流水线的句子/场景为文档，没有 document_term_matrix.npz 时退回每 chunk_words 个连续词一个文档；模型按语料哈希缓存
+    matrix, unit = topic_matrix(words, chunk_words=chunk_words)
+    lda_model = train_topic_model(matrix, num_topics=num_topics, unit=unit)
     
-    print("\n(Topic Modeling):")
+    print(f"\n(Topic Modeling, documents: {unit}):")
     topics = lda_model.print_topics(num_words=num_words)
     for topic in topics:
         print(f"Topic {topic[0]}: {topic[1]}")
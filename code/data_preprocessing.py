@@ -4,52 +4,96 @@ import spacy
 import json
 import os
 import sys
-import io
-import nltk
-from nltk.tokenize import sent_tokenize
-from collections import Counter
+import multiprocessing
+from config import config
 
-# 创建一个download_nltk_data.py文件
-import nltk
-nltk.download('punkt_tab')
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-
-# 创建存储路径
-output_dir = "processed_data"
-os.makedirs(output_dir, exist_ok=True)
+# 共享 src/ 下的分析模块（术语匹配器等）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import resources
+import lexicon_matcher
+import corpus_matrix
+import concordance
+from lexicon_matcher import get_matcher
+from stage_cache import Stage, StagePipeline, file_digest, read_text
+from corpus_matrix import DocumentTermMatrix
+from concordance import ConcordanceIndex
 
 # Step 1: 提取 PDF 文本并清洗
-def extract_and_clean_text(pdf_path, output_path):
+def clean_page_text(text):
+    """
+    清洗单页文本：去除页码、标准化标点、压缩空白
+    :param text: 单页原始文本
+    :return: 清洗后的单页文本
+    """
+    # 清洗文本：去除页眉页脚和特殊格式符号
+    # 移除页码
+    text = re.sub(r'\b\d+\b\s*$', '', text, flags=re.MULTILINE)
+    # 标准化标点符号
+    text = re.sub(r'["""]', '"', text)  # 标准化引号
+    text = re.sub(r"[''']", "'", text)  # 标准化单引号
+    text = re.sub(r'—|–', '-', text)    # 标准化破折号
+    # 去除多余换行符和空白字符
+    return re.sub(r'\s+', ' ', text).strip()
+
+# 每个工作进程持有自己的 fitz 文档句柄
+_worker_pdf = None
+
+def _open_worker_pdf(pdf_path):
+    global _worker_pdf
+    _worker_pdf = fitz.open(pdf_path)
+
+def _extract_page_range(page_range):
+    start, end = page_range
+    return [clean_page_text(_worker_pdf[page_number].get_text()) for page_number in range(start, end)]
+
+def iter_clean_pages(pdf_path, workers=config.PDF_WORKERS, pages_per_chunk=config.PDF_PAGES_PER_CHUNK):
     """
-    从 PDF 文件提取纯文本内容，清洗后保存为 txt 文件
+    按页流式提取并清洗 PDF 文本，页序保持不变
+    :param pdf_path: PDF 文件路径
+    :param workers: 并行提取的进程数（1 表示在当前进程中顺序提取）
+    :param pages_per_chunk: 每个任务包含的页数
+    :return: 逐页产出清洗后文本的生成器
+    """
+    with fitz.open(pdf_path) as pdf:
+        page_count = pdf.page_count
+        if workers <= 1:
+            for page in pdf:
+                yield clean_page_text(page.get_text())
+            return
+    page_ranges = [(start, min(start + pages_per_chunk, page_count))
+                   for start in range(0, page_count, pages_per_chunk)]
+    with multiprocessing.Pool(workers, initializer=_open_worker_pdf, initargs=(pdf_path,)) as pool:
+        # imap 按提交顺序返回结果，同时只在内存中保留少量页
+        for pages in pool.imap(_extract_page_range, page_ranges):
+            yield from pages
+
+def extract_and_clean_text(pdf_path, output_path, workers=config.PDF_WORKERS, return_text=True):
+    """
+    从 PDF 文件提取纯文本内容，清洗后逐页写入 txt 文件
     :param pdf_path: PDF 文件路径
     :param output_path: 输出 txt 文件路径
+    :param workers: 并行提取的进程数
+    :param return_text: 是否返回完整文本（超大文件可设为 False，只写文件以限制内存）
+    :return: 清洗后的文本；return_text 为 False 时返回写入的字符数
     """
     try:
-        with fitz.open(pdf_path) as pdf:
-            text = ""
-            for page_number, page in enumerate(pdf, start=1):
-                page_text = page.get_text()
-                text += page_text
-                
-        # 清洗文本：去除页眉页脚和特殊格式符号
-        # 移除页码
-        text = re.sub(r'\b\d+\b\s*$', '', text, flags=re.MULTILINE)
-        # 标准化标点符号
-        text = re.sub(r'["""]', '"', text)  # 标准化引号
-        text = re.sub(r"[''']", "'", text)  # 标准化单引号
-        text = re.sub(r'—|–', '-', text)    # 标准化破折号
-        # 去除多余换行符和空白字符
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        # 保存清洗后的文本
+        pages = [] if return_text else None
+        written = 0
         with open(output_path, "w", encoding="utf-8") as file:
-            file.write(text)
+            for page_text in iter_clean_pages(pdf_path, workers):
+                if not page_text:
+                    continue
+                # 页与页之间用单个空格连接，与整体压缩空白的结果一致
+                chunk = page_text if written == 0 else " " + page_text
+                file.write(chunk)
+                written += len(chunk)
+                if pages is not None:
+                    pages.append(chunk)
         print(f"清洗后的文本已保存到 {output_path}")
-        return text
+        return "".join(pages) if pages is not None else written
     except Exception as e:
         print(f"提取文本时出错: {e}")
-        return ""
+        return "" if return_text else 0
 
 # Step 2: 按场景分割文本，增强对场景的识别
 def split_by_scene(text):
@@ -109,13 +153,8 @@ def split_into_sentences(text):
     :param text: 场景内容
     :return: 切分后的句子列表
     """
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
-    
-    # 使用NLTK进行句子分割，更好处理引号和缩写
-    sentences = sent_tokenize(text)
+    # 使用NLTK进行句子分割，更好处理引号和缩写（punkt 数据缺失时直接报错并提示安装命令，不会联网下载）
+    sentences = resources.get("sent_tokenize")(text)
     
     # 过滤空句子
     return [sentence.strip() for sentence in sentences if sentence.strip()]
@@ -128,12 +167,9 @@ def is_legal_discourse(sentence, legal_terms):
     :param legal_terms: 法律术语集合
     :return: 布尔值，表示是否属于法律话语
     """
-    # 转小写后匹配法律术语
-    sentence_lower = sentence.lower()
-    # 计算法律术语出现次数
-    term_count = sum(1 for term in legal_terms if term in sentence_lower)
+    # 使用编译后的术语匹配器（按词边界匹配，一次扫描覆盖全部术语）
     # 如果包含一定数量的法律术语，判定为法律话语
-    return term_count >= 1
+    return get_matcher(legal_terms).contains(sentence, minimum=1)
 
 # Step 5: 构建法律话语和创伤叙事语料库
 def build_corpora(parts, legal_terms):
@@ -171,20 +207,35 @@ def build_corpora(parts, legal_terms):
     }
 
 # Step 6: 词汇标准化
-def normalize_text(sentences, stopwords):
+# 词形还原只依赖 tagger / attribute_ruler / lemmatizer，句法分析和实体识别可以关闭
+NORMALIZER_DISABLED_PIPES = ("parser", "ner", "senter")
+
+def load_normalizer(model_name=config.SPACY_MODEL):
+    """
+    加载用于标准化的 spaCy 模型（只加载一次，供所有语料库共用）
+    :param model_name: spaCy 模型名称
+    :return: 关闭了无关组件的 nlp 对象
+    """
+    return spacy.load(model_name, disable=list(NORMALIZER_DISABLED_PIPES))
+
+def normalize_text(sentences, stopwords, nlp=None,
+                   batch_size=config.NORMALIZE_BATCH_SIZE, n_process=config.NORMALIZE_N_PROCESS):
     """
     对句子列表进行小写化、词形还原和停用词过滤
     :param sentences: 切分后的句子列表
     :param stopwords: 停用词集合
+    :param nlp: 预先加载的 spaCy 模型，为空时调用 load_normalizer
+    :param batch_size: nlp.pipe 的批大小
+    :param n_process: nlp.pipe 使用的进程数
     :return: 标准化后的句子列表
     """
-    nlp = spacy.load("en_core_web_sm")
+    if nlp is None:
+        nlp = load_normalizer()
     normalized = []
     
-    for sentence_obj in sentences:
-        sentence = sentence_obj["text"]
-        doc = nlp(sentence.lower())
-        
+    # 使用 nlp.pipe 批量处理，as_tuples 保证元数据与结果一一对应
+    texts = ((sentence_obj["text"].lower(), sentence_obj) for sentence_obj in sentences)
+    for doc, sentence_obj in nlp.pipe(texts, as_tuples=True, batch_size=batch_size, n_process=n_process):
         # 保留情感词、法律术语、人称代词等
         tokens = []
         for token in doc:
@@ -195,7 +246,7 @@ def normalize_text(sentences, stopwords):
         # 添加标准化后的文本和原始元数据
         normalized.append({
             "text": " ".join(tokens),
-            "original": sentence,
+            "original": sentence_obj["text"],
             "source": sentence_obj["source"],
             "part": sentence_obj["part"]
         })
@@ -228,17 +279,8 @@ def get_corpus_stats(corpus):
     :param corpus: 语料库
     :return: 统计信息字典
     """
-    all_words = []
-    for item in corpus:
-        words = item["text"].split()
-        all_words.extend(words)
-    
-    return {
-        "sentence_count": len(corpus),
-        "word_count": len(all_words),
-        "unique_words": len(set(all_words)),
-        "top_words": Counter(all_words).most_common(20)
-    }
+    return DocumentTermMatrix.from_texts([item["text"] for item in corpus]).stats(top_n=20)
+
 def save_scenes_to_json(scenes, output_path):
     """
     将场景列表保存为 JSON 文件
@@ -254,16 +296,128 @@ def save_parts_to_json(parts, output_path):
     with open(output_path, "w", encoding="utf-8") as file:
         json.dump(parts, file, ensure_ascii=False, indent=4)
     print(f"分段后的数据已保存到 {output_path}")
+# Step 7: 将各步骤组织为带内容寻址缓存的 DAG
+def load_cleaned_text(pdf_path, output_path):
+    """
+    提取并清洗 PDF 文本；提取失败时读取已保存的文件
+    :param pdf_path: PDF 文件路径
+    :param output_path: 输出 txt 文件路径
+    :return: 清洗后的文本
+    """
+    text = extract_and_clean_text(pdf_path, output_path)
+    if not text:  # 如果提取失败，尝试读取已保存的文件
+        with open(output_path, "r", encoding="utf-8") as file:
+            text = file.read()
+    return text
+
+def normalize_corpora(corpora, stopwords):
+    """
+    标准化两个语料库（模型只加载一次，两个语料库共用）
+    """
+    normalizer = load_normalizer()
+    return {
+        "legal_discourse": normalize_text(corpora["legal_discourse"], stopwords, nlp=normalizer),
+        "trauma_narrative": normalize_text(corpora["trauma_narrative"], stopwords, nlp=normalizer)
+    }
+
+def build_document_term_matrix(normalized_corpora):
+    """
+    由标准化语料库构建共享的稀疏文档-词矩阵（每个句子一行，标注所属语料库）
+    """
+    return DocumentTermMatrix.from_normalized_corpora(normalized_corpora)
+
+def save_document_term_matrix(matrix, output_path):
+    """
+    保存文档-词矩阵
+    :param matrix: DocumentTermMatrix 对象
+    :param output_path: 输出路径
+    """
+    matrix.save(output_path)
+    print(f"文档-词矩阵已保存到 {output_path}（{len(matrix)} 句, {len(matrix.vocab)} 词）")
+
+def compute_corpus_stats(matrix):
+    """
+    由文档-词矩阵计算两个语料库的统计信息
+    """
+    return {
+        "legal_discourse": matrix.stats(matrix.rows(corpus="legal_discourse"), top_n=20),
+        "trauma_narrative": matrix.stats(matrix.rows(corpus="trauma_narrative"), top_n=20)
+    }
+
+def save_stats_to_json(stats, output_path):
+    """
+    将语料库统计信息保存为 JSON 文件
+    """
+    with open(output_path, "w", encoding="utf-8") as file:
+        json.dump(stats, file, ensure_ascii=False, indent=4)
+    print(f"语料库统计信息已保存到 {output_path}")
+
+def build_concordance_index(scenes, legal_terms):
+    """
+    为每个词和多词法律术语建立位置倒排索引（场景, 句子, 字符偏移），供 KWIC 检索
+    :param scenes: 场景列表
+    :param legal_terms: 法律术语集合
+    :return: ConcordanceIndex 对象
+    """
+    return ConcordanceIndex.build(scenes, legal_terms, split_into_sentences)
+
+def save_concordance_index(index, output_path):
+    index.save(output_path)
+    print(f"倒排索引已保存到 {output_path}（{len(index.terms)} 个词条，{index.size} 条记录）")
+
+def build_pipeline(pdf_path, output_dir, legal_terms, stopwords):
+    """
+    构建预处理 DAG：每个阶段的键由输入、参数、代码和模型版本决定，键不变的阶段直接复用输出
+    :param pdf_path: PDF 文件路径
+    :param output_dir: 输出目录
+    :param legal_terms: 法律术语集合
+    :param stopwords: 停用词集合
+    :return: StagePipeline 对象
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    pipeline = StagePipeline(os.path.join(output_dir, ".stage_manifest.json"))
+    # code 列出每个阶段调用的函数/类/模块，修改其中任何一个都会使该阶段及其下游重新计算
+    pipeline.add(Stage("cleaned_text", load_cleaned_text, os.path.join(output_dir, "cleaned_text.txt"),
+                       params={"pdf_path": pdf_path, "output_path": os.path.join(output_dir, "cleaned_text.txt")},
+                       fingerprint={"pdf_sha256": file_digest(pdf_path) if os.path.exists(pdf_path) else None},
+                       code=[extract_and_clean_text, iter_clean_pages, _extract_page_range, clean_page_text],
+                       load=read_text))
+    pipeline.add(Stage("scenes", split_by_scene, os.path.join(output_dir, "scenes.json"),
+                       deps=["cleaned_text"], save=save_scenes_to_json))
+    pipeline.add(Stage("parts", split_into_parts, os.path.join(output_dir, "parts.json"),
+                       deps=["scenes"], save=save_parts_to_json))
+    pipeline.add(Stage("corpora", build_corpora, os.path.join(output_dir, "corpora.json"),
+                       deps=["parts"], params={"legal_terms": legal_terms},
+                       code=[split_into_sentences, is_legal_discourse, lexicon_matcher],
+                       save=save_corpora_to_json))
+    pipeline.add(Stage("normalized_corpora", normalize_corpora, os.path.join(output_dir, "normalized_corpora.json"),
+                       deps=["corpora"], params={"stopwords": stopwords},
+                       fingerprint={"spacy_model": config.SPACY_MODEL,
+                                    "model_version": spacy.util.get_package_version(config.SPACY_MODEL),
+                                    "spacy_version": spacy.__version__,
+                                    "disabled_pipes": NORMALIZER_DISABLED_PIPES},
+                       code=[normalize_text, load_normalizer],
+                       save=save_normalized_corpora))
+    pipeline.add(Stage("document_term_matrix", build_document_term_matrix,
+                       os.path.join(output_dir, "document_term_matrix.npz"),
+                       deps=["normalized_corpora"], code=[corpus_matrix],
+                       save=save_document_term_matrix, load=DocumentTermMatrix.load))
+    pipeline.add(Stage("corpus_stats", compute_corpus_stats, os.path.join(output_dir, "corpus_stats.json"),
+                       deps=["document_term_matrix"], code=[corpus_matrix], save=save_stats_to_json))
+    pipeline.add(Stage("concordance_index", build_concordance_index, os.path.join(output_dir, "concordance"),
+                       deps=["scenes"], params={"legal_terms": legal_terms},
+                       code=[concordance, lexicon_matcher, split_into_sentences],
+                       save=save_concordance_index, load=ConcordanceIndex.load))
+    return pipeline
+
 # 主流程
 if __name__ == "__main__":
+    # 输出编码与存储路径只在作为脚本运行时设置（被基准测试等导入时不产生副作用）
+    sys.stdout.reconfigure(encoding="utf-8")
+    output_dir = "processed_data"
+
     # 配置路径
     pdf_path = "code/raw_data/PrimaFacie_text.pdf"
-    cleaned_text_path = os.path.join(output_dir, "cleaned_text.txt")
-    scenes_json_path = os.path.join(output_dir, "scenes.json")
-    parts_json_path = os.path.join(output_dir, "parts.json")
-    corpora_json_path = os.path.join(output_dir, "corpora.json")
-    normalized_corpora_json_path = os.path.join(output_dir, "normalized_corpora.json")
-    stats_json_path = os.path.join(output_dir, "corpus_stats.json")
     
     # 法律术语集，用于识别法律话语
     legal_terms = {
@@ -320,38 +474,13 @@ if __name__ == "__main__":
         if word in custom_stopwords:
             custom_stopwords.remove(word)
     
-    # 执行各步骤
-    text = extract_and_clean_text(pdf_path, cleaned_text_path)
-    if not text:  # 如果提取失败，尝试读取已保存的文件
-        with open(cleaned_text_path, "r", encoding="utf-8") as file:
-            text = file.read()
-    
-    scenes = split_by_scene(text)
-    save_scenes_to_json(scenes, scenes_json_path)
-    
-    parts = split_into_parts(scenes)
-    save_parts_to_json(parts, parts_json_path)
-    
-    # 构建语料库
-    corpora = build_corpora(parts, legal_terms)
-    save_corpora_to_json(corpora, corpora_json_path)
-    
-    # 标准化语料库
-    normalized_corpora = {
-        "legal_discourse": normalize_text(corpora["legal_discourse"], custom_stopwords),
-        "trauma_narrative": normalize_text(corpora["trauma_narrative"], custom_stopwords)
-    }
-    save_normalized_corpora(normalized_corpora, normalized_corpora_json_path)
-    
-    # 计算并保存语料库统计信息
-    stats = {
-        "legal_discourse": get_corpus_stats(normalized_corpora["legal_discourse"]),
-        "trauma_narrative": get_corpus_stats(normalized_corpora["trauma_narrative"])
-    }
-    with open(stats_json_path, "w", encoding="utf-8") as file:
-        json.dump(stats, file, ensure_ascii=False, indent=4)
-    print(f"语料库统计信息已保存到 {stats_json_path}")
+    # 执行各步骤（输入和参数未变化的阶段会被跳过）
+    pipeline = build_pipeline(pdf_path, output_dir, legal_terms, custom_stopwords)
+    corpora = pipeline.get("corpora")
+    stats = pipeline.get("corpus_stats")
+    concordance_index = pipeline.get("concordance_index")
     
     # 打印语料库大小信息
     print(f"法律话语语料库: {len(corpora['legal_discourse'])} 句, 约 {stats['legal_discourse']['word_count']} 词")
     print(f"创伤叙事语料库: {len(corpora['trauma_narrative'])} 句, 约 {stats['trauma_narrative']['word_count']} 词")
+    print(f"倒排索引: {len(concordance_index.terms)} 个词条, {concordance_index.size} 条记录（KWIC 检索: python code/concordance.py consent \"prima facie\"）")
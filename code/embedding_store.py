@@ -0,0 +1,91 @@
+# embedding_store.py
+# 句向量持久化存储：float32 矩阵以内存映射方式读取，配合“句子哈希 -> 行号”索引，每个句子在所有运行中只编码一次
+
+import os
+import re
+import json
+import hashlib
+import numpy as np
+
+
+def text_key(text):
+    """
+    计算文本的索引键
+    :param text: 句子或文档文本
+    :return: 十六进制哈希字符串
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    句向量存储：模型只加载一次，未见过的文本编码后追加到矩阵文件末尾
+    :param store_dir: 存储目录
+    :param model_name: sentence-transformers 模型名称（每个模型使用独立的矩阵和索引文件）
+    :param batch_size: 编码时的批大小
+    """
+
+    def __init__(self, store_dir, model_name, batch_size=64):
+        self.store_dir = store_dir
+        self.model_name = model_name
+        self.batch_size = batch_size
+        safe_name = re.sub(r"[^\w.-]", "_", model_name)
+        self.matrix_path = os.path.join(store_dir, f"{safe_name}.f32")
+        self.index_path = os.path.join(store_dir, f"{safe_name}.index.json")
+        self._model = None
+        self.dim = None
+        self.rows = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as file:
+                index = json.load(file)
+            self.dim = index["dim"]
+            self.rows = index["rows"]
+
+    @property
+    def model(self):
+        """首次使用时加载 SentenceTransformer 模型，之后复用"""
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def __len__(self):
+        return len(self.rows)
+
+    def matrix(self):
+        """以只读内存映射方式打开全部向量"""
+        if not self.rows:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(len(self.rows), self.dim))
+
+    def _append(self, keys, texts):
+        vectors = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                                    show_progress_bar=False).astype(np.float32)
+        self.dim = vectors.shape[1]
+        os.makedirs(self.store_dir, exist_ok=True)
+        # 先追加矩阵再写索引，索引中只会出现已经落盘的行；上次中断留下的多余行先截掉
+        if os.path.exists(self.matrix_path):
+            with open(self.matrix_path, "r+b") as file:
+                file.truncate(len(self.rows) * self.dim * 4)
+        with open(self.matrix_path, "ab") as file:
+            file.write(np.ascontiguousarray(vectors).tobytes())
+        for key in keys:
+            self.rows[key] = len(self.rows)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"model": self.model_name, "dim": self.dim, "rows": self.rows}, file)
+        os.replace(tmp_path, self.index_path)
+
+    def encode(self, texts):
+        """
+        返回文本对应的句向量，只对未存储过的文本调用模型
+        :param texts: 文本列表
+        :return: 形状为 (len(texts), dim) 的 float32 数组
+        """
+        keys = [text_key(text) for text in texts]
+        missing = {key: text for key, text in zip(keys, texts) if key not in self.rows}
+        if missing:
+            self._append(list(missing), list(missing.values()))
+        if not keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self.matrix()[[self.rows[key] for key in keys]])
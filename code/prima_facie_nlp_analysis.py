@@ -4,34 +4,38 @@
 
 import os
 import json
-from collections import Counter
-from nltk import bigrams
-from textblob import TextBlob
 from keybert import KeyBERT
 from bertopic import BERTopic
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
-from nltk.collocations import BigramCollocationFinder
-from nltk.metrics import BigramAssocMeasures
 import sys
 import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+import argparse
+from config import config
+from textblob_sentiment import analyze_sentences
+from embedding_store import EmbeddingStore
+from corpus_matrix import DocumentTermMatrix
+from collocations import top_collocations
+from sklearn.feature_extraction.text import CountVectorizer
+
+# 绘图与 src/ 共用同一个渲染器（Agg 后端、并行进程、按数据哈希跳过未变化的图）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from rendering import Figure, render_figures, bar_chart, trend_chart, word_cloud
+from sliding_window import window_starts, rolling_mean_std
 # ====== 一、加载数据 ======
 
-with open('./processed_data/normalized_sentences.json', 'r', encoding='utf-8') as f:
-    normalized_sentences = json.load(f)
+def load_data():
+    with open('./processed_data/normalized_sentences.json', 'r', encoding='utf-8') as f:
+        normalized_sentences = json.load(f)
 
-with open('./processed_data/parts.json', 'r', encoding='utf-8') as f:
-    parts = json.load(f)
+    with open('./processed_data/parts.json', 'r', encoding='utf-8') as f:
+        parts = json.load(f)
 
-# 根据 parts.json 计算 Part One 和 Part Two 的句子总数（可选，仅用于打印检查）
-part_one_sentence_count = sum(len(sents) for sents in parts["Part One"].values())
-part_two_sentence_count = sum(len(sents) for sents in parts["Part Two"].values())
+    # 根据 parts.json 计算 Part One 和 Part Two 的句子总数（可选，仅用于打印检查）
+    part_one_sentence_count = sum(len(sents) for sents in parts["Part One"].values())
+    part_two_sentence_count = sum(len(sents) for sents in parts["Part Two"].values())
 
-print(f"Part One total scenes: {len(parts['Part One'])}, total sentences approx: {part_one_sentence_count}")
-print(f"Part Two total scenes: {len(parts['Part Two'])}, total sentences approx: {part_two_sentence_count}")
+    print(f"Part One total scenes: {len(parts['Part One'])}, total sentences approx: {part_one_sentence_count}")
+    print(f"Part Two total scenes: {len(parts['Part Two'])}, total sentences approx: {part_two_sentence_count}")
+    return normalized_sentences, parts
 
 # 将 normalized_sentences 按 Part One 和 Part Two 的结构，合并成两个句子列表
 def flatten_part_sentences(normalized_data, part_name):
@@ -42,42 +46,47 @@ def flatten_part_sentences(normalized_data, part_name):
         all_sents.extend(scenes[scene_title])
     return all_sents
 
-part1_sentences = flatten_part_sentences(normalized_sentences, "Part One")
-part2_sentences = flatten_part_sentences(normalized_sentences, "Part Two")
-
-print(f"Part One sentences count: {len(part1_sentences)}")
-print(f"Part Two sentences count: {len(part2_sentences)}")
-
 
 
 # ====== 二、功能函数定义 ======
 
-def word_freq(sentences):
-    all_words = [word for sent in sentences for word in sent.split()]
-    return Counter(all_words).most_common(30)
+def word_freq(matrix, rows=None, top_n=30):
+    # 直接由文档-词矩阵的列和得到词频
+    return matrix.most_common(top_n, rows)
 
-def top_bigrams_with_pmi(sentences, top_n=15):
-    all_words = [word for sent in sentences for word in sent.split()]
-    finder = BigramCollocationFinder.from_words(all_words)
-    scored = finder.score_ngrams(BigramAssocMeasures.pmi)
-    return sorted(scored, key=lambda x: -x[1])[:top_n]
+def top_bigrams_with_pmi(matrix, rows=None, top_n=15, min_freq=config.COLLOCATION_MIN_FREQ):
+    # 在所选句子的词 id 序列上向量化计算 PMI，低频词对先过滤掉
+    return top_collocations(matrix.tokens(rows), matrix.vocab, "pmi", top_n,
+                            window=config.COLLOCATION_WINDOW, min_freq=min_freq)
 
 def sentiment_analysis(sentences):
-    return [
-        {
-            "sentence": s,
-            "polarity": TextBlob(s).sentiment.polarity,
-            "subjectivity": TextBlob(s).sentiment.subjectivity
-        } for s in sentences
-    ]
+    # 每句只分析一次，结果按句子哈希缓存，返回列式数组
+    return analyze_sentences(sentences, cache_path=config.SENTIMENT_CACHE_PATH,
+                             workers=config.SENTIMENT_WORKERS)
+
+# 句向量模型只加载一次，KeyBERT 和 BERTopic 共用同一个持久化向量库
+_embedding_store = None
+
+def get_embedding_store():
+    global _embedding_store
+    if _embedding_store is None:
+        _embedding_store = EmbeddingStore(config.EMBEDDING_STORE_PATH, config.EMBEDDING_MODEL)
+    return _embedding_store
 
 def extract_keywords(sentences):
-    kw_model = KeyBERT()
-    return kw_model.extract_keywords(" ".join(sentences), keyphrase_ngram_range=(1, 2), stop_words='english', top_n=30)
+    store = get_embedding_store()
+    kw_model = KeyBERT(model=store.model)
+    doc = " ".join(sentences)
+    # 候选词与 KeyBERT 内部使用的 CountVectorizer 参数一致，保证向量与候选词一一对应
+    candidates = CountVectorizer(ngram_range=(1, 2), stop_words='english').fit([doc]).get_feature_names_out()
+    return kw_model.extract_keywords(doc, keyphrase_ngram_range=(1, 2), stop_words='english', top_n=30,
+                                     doc_embeddings=store.encode([doc]),
+                                     word_embeddings=store.encode(list(candidates)))
 
 def topic_modeling(sentences, html_output):
-    topic_model = BERTopic()
-    topics, _ = topic_model.fit_transform(sentences)
+    store = get_embedding_store()
+    topic_model = BERTopic(embedding_model=store.model)
+    topics, _ = topic_model.fit_transform(sentences, embeddings=store.encode(sentences))
 
      # 提取主题信息
     topic_info = topic_model.get_topic_info()
@@ -90,80 +99,101 @@ def topic_modeling(sentences, html_output):
     # 可视化主题
     topic_model.visualize_barchart(top_n_topics=5).write_html(html_output)
 
-def plot_sentiment_trend(sentiments, part_label):
-    df = pd.DataFrame(sentiments)
-    plt.figure(figsize=(12, 6))
-    sns.lineplot(x=range(len(df)), y="polarity", data=df, label="Polarity")
-    sns.lineplot(x=range(len(df)), y="subjectivity", data=df, label="Subjectivity")
-    plt.title(f"Sentiment Trends - {part_label}")
-    plt.xlabel("Sentence Index")
-    plt.ylabel("Score")
-    plt.tight_layout()
-    plt.savefig(f"./output/sentiment_trend_{part_label}.png")
-    plt.close()
+def plot_sentiment_trend(sentiments, part_label, window=config.TREND_WINDOW, stride=config.TREND_STRIDE):
+    """
+    情感趋势图：逐句得分噪声太大，改为滑动窗口的均值 ± 标准差（前缀和计算，O(N)）
+    只生成图表描述，由 render_figures 统一绘制
+    :param sentiments: sentiment_analysis 返回的列式结果
+    :param part_label: 部分标签，如 "part1"
+    :param window: 窗口大小（句子数）
+    :param stride: 步长（句子数）
+    :return: Figure
+    """
+    starts = window_starts(len(sentiments["polarity"]), window, stride)
+    panels = []
+    for label in ("polarity", "subjectivity"):
+        mean, std = rolling_mean_std(sentiments[label], window, stride)
+        panels.append((label.capitalize(), "Sentence Index", starts, mean, std))
+    return Figure(f"./output/sentiment_trend_{part_label}.png", trend_chart, panels=panels,
+                  title=f"Sentiment Trends - {part_label} (window {window}, stride {stride})", figsize=(12, 6))
 
 def generate_wordcloud(keywords, filename):
-    freq_dict = dict(keywords)
-    wc = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(freq_dict)
-    wc.to_file(f"./output/{filename}")
+    return Figure(f"./output/{filename}", word_cloud, frequencies=[[word, float(score)] for word, score in keywords])
 
 def plot_word_freq(freq, part_label):
     words, counts = zip(*freq)
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=list(words), y=list(counts))
-    plt.title(f"Top 30 Word Frequencies - {part_label}")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(f"./output/word_freq_{part_label}.png")
-    plt.close()
-
-# ====== 三、创建输出目录 ======
-os.makedirs("./output", exist_ok=True)
-
-# ====== 四、分析流程执行 ======
-
-# --- Part 1 ---
-print("分析 Part 1...")
-freq1 = word_freq(part1_sentences)
-print("词频数据 Part 1:", freq1)
-bigrams1 = top_bigrams_with_pmi(part1_sentences)
-print("大词对数据 Part 1:", bigrams1)
-sentiments1 = sentiment_analysis(part1_sentences)
-print("情感分析结果 Part 1:", sentiments1)
-keywords1 = extract_keywords(part1_sentences)
-print("关键词 Part 1:", keywords1)
-topic_modeling(part1_sentences, "./output/topic_barchart_part1.html")
-plot_sentiment_trend(sentiments1, "part1")
-generate_wordcloud(keywords1, "wordcloud_part1.png")
-plot_word_freq(freq1, "part1")
-
-
-
-# --- Part 2 ---
-print("分析 Part 2...")
-freq2 = word_freq(part2_sentences)
-print("词频数据 Part 2:", freq2)
-bigrams2 = top_bigrams_with_pmi(part2_sentences)
-print("大词对数据 Part 2:", bigrams2)
-sentiments2 = sentiment_analysis(part2_sentences)
-print("情感分析结果 Part 2:", sentiments2)
-keywords2 = extract_keywords(part2_sentences)
-print("关键词 Part 2:", keywords2)
-topic_modeling(part2_sentences, "./output/topic_barchart_part2.html")
-plot_sentiment_trend(sentiments2, "part2")
-generate_wordcloud(keywords2, "wordcloud_part2.png")
-plot_word_freq(freq2, "part2")
-# ====== 五、保存结果为 JSON 文件 ======
-with open("./output/word_freq_part1.json", "w", encoding="utf-8") as f:
-    json.dump(freq1, f, ensure_ascii=False, indent=2)
-
-with open("./output/word_freq_part2.json", "w", encoding="utf-8") as f:
-    json.dump(freq2, f, ensure_ascii=False, indent=2)
-
-with open("./output/bigrams_part1.json", "w", encoding="utf-8") as f:
-    json.dump(bigrams1, f, ensure_ascii=False, indent=2)
-
-with open("./output/bigrams_part2.json", "w", encoding="utf-8") as f:
-    json.dump(bigrams2, f, ensure_ascii=False, indent=2)
-
-print("✅ 分析完成！所有文件已保存在 ./output 目录中。")
+    return Figure(f"./output/word_freq_{part_label}.png", bar_chart, labels=list(words), values=list(counts),
+                  title=f"Top 30 Word Frequencies - {part_label}", figsize=(12, 6), rotation=45)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prima Facie 第一、二部分的词频、词对、情感、关键词与主题分析")
+    parser.add_argument("--no-plots", action="store_true", help="跳过图表绘制（批量运行）")
+    parser.add_argument("--plot-workers", type=int, default=config.PLOT_WORKERS, help="并行绘图的进程数")
+    args = parser.parse_args()
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    normalized_sentences, parts = load_data()
+    # 稀疏文档-词矩阵只构建一次，词频和词对统计都按部分选取行
+    matrix = DocumentTermMatrix.from_normalized_sentences(normalized_sentences)
+    part1_rows = matrix.rows(part="Part One")
+    part2_rows = matrix.rows(part="Part Two")
+    part1_sentences = flatten_part_sentences(normalized_sentences, "Part One")
+    part2_sentences = flatten_part_sentences(normalized_sentences, "Part Two")
+
+    print(f"Part One sentences count: {len(part1_sentences)}")
+    print(f"Part Two sentences count: {len(part2_sentences)}")
+
+    # ====== 三、创建输出目录 ======
+    os.makedirs("./output", exist_ok=True)
+    figures = []
+
+    # ====== 四、分析流程执行 ======
+
+    # --- Part 1 ---
+    print("分析 Part 1...")
+    freq1 = word_freq(matrix, part1_rows)
+    print("词频数据 Part 1:", freq1)
+    bigrams1 = top_bigrams_with_pmi(matrix, part1_rows)
+    print("大词对数据 Part 1:", bigrams1)
+    sentiments1 = sentiment_analysis(part1_sentences)
+    print("情感分析结果 Part 1:", sentiments1)
+    keywords1 = extract_keywords(part1_sentences)
+    print("关键词 Part 1:", keywords1)
+    topic_modeling(part1_sentences, "./output/topic_barchart_part1.html")
+    figures += [plot_sentiment_trend(sentiments1, "part1"),
+                generate_wordcloud(keywords1, "wordcloud_part1.png"),
+                plot_word_freq(freq1, "part1")]
+
+
+
+    # --- Part 2 ---
+    print("分析 Part 2...")
+    freq2 = word_freq(matrix, part2_rows)
+    print("词频数据 Part 2:", freq2)
+    bigrams2 = top_bigrams_with_pmi(matrix, part2_rows)
+    print("大词对数据 Part 2:", bigrams2)
+    sentiments2 = sentiment_analysis(part2_sentences)
+    print("情感分析结果 Part 2:", sentiments2)
+    keywords2 = extract_keywords(part2_sentences)
+    print("关键词 Part 2:", keywords2)
+    topic_modeling(part2_sentences, "./output/topic_barchart_part2.html")
+    figures += [plot_sentiment_trend(sentiments2, "part2"),
+                generate_wordcloud(keywords2, "wordcloud_part2.png"),
+                plot_word_freq(freq2, "part2")]
+
+    # 所有图表最后一次性绘制：数据未变化的图直接跳过，其余按 PLOT_WORKERS 并行
+    if config.MAKE_PLOTS and not args.no_plots:
+        render_figures(figures, workers=args.plot_workers)
+    # ====== 五、保存结果为 JSON 文件 ======
+    with open("./output/word_freq_part1.json", "w", encoding="utf-8") as f:
+        json.dump(freq1, f, ensure_ascii=False, indent=2)
+
+    with open("./output/word_freq_part2.json", "w", encoding="utf-8") as f:
+        json.dump(freq2, f, ensure_ascii=False, indent=2)
+
+    with open("./output/bigrams_part1.json", "w", encoding="utf-8") as f:
+        json.dump(bigrams1, f, ensure_ascii=False, indent=2)
+
+    with open("./output/bigrams_part2.json", "w", encoding="utf-8") as f:
+        json.dump(bigrams2, f, ensure_ascii=False, indent=2)
+
+    print("✅ 分析完成！所有文件已保存在 ./output 目录中。")
@@ -0,0 +1,130 @@
+# stage_cache.py
+# 预处理流水线的内容寻址缓存：每个阶段的输出由“输入 + 参数 + 代码”的哈希值标识，哈希不变则跳过该阶段
+
+import os
+import json
+import hashlib
+import inspect
+
+
+def _jsonable(value):
+    """将集合等对象转换为可稳定序列化的形式"""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"无法序列化参数: {type(value).__name__}")
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    计算文件内容的 SHA-256 哈希
+    :param path: 文件路径
+    :param chunk_size: 每次读取的字节数
+    :return: 十六进制哈希字符串
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return file.read()
+
+
+class Stage:
+    """
+    流水线中的一个阶段
+    :param name: 阶段名称
+    :param func: 计算函数，按 deps 顺序接收上游阶段的结果
+    :param output: 输出文件路径
+    :param deps: 上游阶段名称列表
+    :param params: 以关键字参数传给 func 的参数（参与哈希）
+    :param fingerprint: 只参与哈希、不传给 func 的附加信息（如输入文件哈希、模型版本）
+    :param code: func 调用的函数、类或模块，其源码与 func 的源码一起参与哈希（修改被调用的代码也会使缓存失效）
+    :param save: 保存函数 save(value, path)；为空表示 func 自己写出文件
+    :param load: 从输出文件读取结果的函数
+    """
+
+    def __init__(self, name, func, output, deps=(), params=None, fingerprint=None, code=(), save=None, load=read_json):
+        self.name = name
+        self.func = func
+        self.output = output
+        self.deps = list(deps)
+        self.params = params or {}
+        self.fingerprint = fingerprint or {}
+        self.code = list(code)
+        self.save = save
+        self.load = load
+
+
+class StagePipeline:
+    """
+    由 Stage 组成的小型 DAG，按拓扑顺序执行，键未变化的阶段直接复用已有输出
+    :param manifest_path: 记录各阶段键值的清单文件路径
+    """
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.stages = {}
+        self.keys = {}
+        self.results = {}
+        self.manifest = read_json(manifest_path) if os.path.exists(manifest_path) else {}
+
+    def add(self, stage):
+        self.stages[stage.name] = stage
+        return stage
+
+    def key(self, name):
+        """阶段键 = 哈希(阶段名 + 函数及其调用代码的源码 + 参数 + 附加指纹 + 上游阶段键)"""
+        if name not in self.keys:
+            stage = self.stages[name]
+            digest = hashlib.sha256()
+            digest.update(name.encode("utf-8"))
+            for obj in [stage.func] + stage.code:
+                digest.update(inspect.getsource(obj).encode("utf-8"))
+            for values in (stage.params, stage.fingerprint):
+                digest.update(json.dumps(values, sort_keys=True, default=_jsonable).encode("utf-8"))
+            for dep in stage.deps:
+                digest.update(self.key(dep).encode("utf-8"))
+            self.keys[name] = digest.hexdigest()
+        return self.keys[name]
+
+    def is_fresh(self, name):
+        stage = self.stages[name]
+        return self.manifest.get(name) == self.key(name) and os.path.exists(stage.output)
+
+    def get(self, name):
+        """
+        返回阶段结果：键未变化时读取缓存输出，否则重新计算并更新清单
+        :param name: 阶段名称
+        :return: 阶段结果
+        """
+        if name in self.results:
+            return self.results[name]
+        stage = self.stages[name]
+        if self.is_fresh(name):
+            print(f"[{name}] 输入未变化，复用 {stage.output}")
+            result = stage.load(stage.output)
+        else:
+            inputs = [self.get(dep) for dep in stage.deps]
+            print(f"[{name}] 重新计算...")
+            result = stage.func(*inputs, **stage.params)
+            if stage.save is not None:
+                stage.save(result, stage.output)
+            self.manifest[name] = self.key(name)
+            self._write_manifest()
+        self.results[name] = result
+        return result
+
+    def _write_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.manifest, file, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.manifest_path)
@@ -1,16 +1,12 @@
 import os
+import sys
 import pandas as pd
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
 import string
 from config import config 
-# 下载 NLTK 必需的数据包
-nltk.download("punkt")
-nltk.download("stopwords")
-nltk.download("wordnet")
-nltk.download("averaged_perceptron_tagger")
+
+# NLTK 数据通过 src/resources.py 按需加载；缺失时给出安装命令，不在导入时联网下载
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import resources
 
 # 创建存储清洗后数据的文件夹
 output_folder = config.PROCESSED_DATA_PATH
@@ -19,14 +15,14 @@ os.makedirs(output_folder, exist_ok=True)
 # 文本清洗和预处理函数
 def preprocess_text(text):
     # 初始化工具
-    lemmatizer = WordNetLemmatizer()
-    stop_words = set(stopwords.words("english"))
+    lemmatizer = resources.get("lemmatizer")
+    stop_words = resources.get("stopwords")
 
     # 1. 转为小写
     text = text.lower()
 
     # 2. 分词
-    tokens = word_tokenize(text)
+    tokens = resources.get("word_tokenize")(text)
 
     # 3. 去除标点符号和数字
     tokens = [word for word in tokens if word.isalnum()]
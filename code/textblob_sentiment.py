@@ -0,0 +1,110 @@
+# textblob_sentiment.py
+# TextBlob 句子情感分析引擎：每个句子只构造一次 TextBlob，结果按句子哈希缓存到 SQLite，支持多进程分块计算
+
+import os
+import sqlite3
+import hashlib
+from multiprocessing import Pool
+from importlib.metadata import version
+import numpy as np
+from textblob import TextBlob
+
+# 分析器版本参与哈希，升级 TextBlob 后旧缓存自动失效
+ANALYZER_VERSION = f"textblob-{version('textblob')}"
+# SQLite 单条语句的参数数量上限较低，查询时分批进行
+_QUERY_BATCH = 900
+
+
+def sentence_key(sentence):
+    """
+    计算句子的缓存键
+    :param sentence: 句子文本
+    :return: 十六进制哈希字符串
+    """
+    return hashlib.sha1(f"{ANALYZER_VERSION}\0{sentence}".encode("utf-8")).hexdigest()
+
+
+def analyze_chunk(sentences):
+    """
+    对一组句子做情感分析，每句只构造一次 TextBlob
+    :param sentences: 句子列表
+    :return: [(polarity, subjectivity), ...]
+    """
+    results = []
+    for sentence in sentences:
+        sentiment = TextBlob(sentence).sentiment
+        results.append((sentiment.polarity, sentiment.subjectivity))
+    return results
+
+
+class SentimentCache:
+    """
+    基于 SQLite 的句子情感缓存：hash -> (polarity, subjectivity)
+    :param path: 数据库文件路径
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment (hash TEXT PRIMARY KEY, polarity REAL, subjectivity REAL)"
+        )
+
+    def get_many(self, keys):
+        found = {}
+        for i in range(0, len(keys), _QUERY_BATCH):
+            batch = keys[i:i + _QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(
+                f"SELECT hash, polarity, subjectivity FROM sentiment WHERE hash IN ({placeholders})", batch
+            )
+            found.update((key, (polarity, subjectivity)) for key, polarity, subjectivity in rows)
+        return found
+
+    def put_many(self, items):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?)",
+                [(key, polarity, subjectivity) for key, (polarity, subjectivity) in items]
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+def analyze_sentences(sentences, cache_path=None, workers=1, chunk_size=500):
+    """
+    批量情感分析：相同句子只计算一次，已缓存的句子直接读取
+    :param sentences: 句子列表
+    :param cache_path: SQLite 缓存文件路径，为空时不使用磁盘缓存
+    :param workers: 计算未缓存句子时使用的进程数
+    :param chunk_size: 每个进程任务包含的句子数
+    :return: 列式结果 {"sentence": 句子列表, "polarity": ndarray, "subjectivity": ndarray}
+    """
+    keys = [sentence_key(sentence) for sentence in sentences]
+    unique = dict(zip(keys, sentences))
+    cache = SentimentCache(cache_path) if cache_path else None
+    try:
+        scores = cache.get_many(list(unique)) if cache else {}
+        missing = [key for key in unique if key not in scores]
+        if missing:
+            texts = [unique[key] for key in missing]
+            chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+            if workers > 1 and len(chunks) > 1:
+                with Pool(workers) as pool:
+                    computed = [row for rows in pool.map(analyze_chunk, chunks) for row in rows]
+            else:
+                computed = analyze_chunk(texts)
+            new_scores = list(zip(missing, computed))
+            scores.update(new_scores)
+            if cache:
+                cache.put_many(new_scores)
+    finally:
+        if cache:
+            cache.close()
+    columns = np.array([scores[key] for key in keys], dtype=float).reshape(len(keys), 2)
+    return {
+        "sentence": list(sentences),
+        "polarity": columns[:, 0],
+        "subjectivity": columns[:, 1]
+    }
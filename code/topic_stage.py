@@ -0,0 +1,129 @@
+# topic_stage.py
+# 主题建模阶段：以句子或场景为文档（没有流水线矩阵时退回连续词块），词袋语料序列化为 MmCorpus 后流式读取，用 LdaMulticore 多进程训练，训练好的模型按语料哈希缓存
+
+import os
+import json
+import hashlib
+import numpy as np
+import gensim
+from gensim import corpora, models
+from gensim.matutils import Sparse2Corpus
+from config import config
+from corpus_matrix import DocumentTermMatrix
+
+DOCUMENT_MATRIX_PATH = os.path.join(config.PROCESSED_DATA_PATH, "document_term_matrix.npz")
+
+
+def load_document_matrix(path=DOCUMENT_MATRIX_PATH):
+    """
+    读取预处理流水线生成的文档-词矩阵
+    :param path: document_term_matrix.npz 路径
+    :return: DocumentTermMatrix 对象
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"找不到 {path}，请先运行 data_preprocessing.py 生成文档-词矩阵")
+    return DocumentTermMatrix.load(path)
+
+
+def chunk_documents(words, size=config.TOPIC_CHUNK_WORDS):
+    """
+    将没有句子边界的词列表（如 processed_data.csv 的 Word 列）按连续 size 个词切分为文档
+    :param words: 词列表
+    :param size: 每个文档的词数
+    :return: DocumentTermMatrix 对象（每行一个词块，按 unit="chunk" 训练）
+    """
+    return DocumentTermMatrix.from_tokens([words[i:i + size] for i in range(0, len(words), size)])
+
+
+def topic_matrix(words, path=DOCUMENT_MATRIX_PATH, chunk_words=config.TOPIC_CHUNK_WORDS):
+    """
+    选择主题模型的语料：优先使用预处理流水线的文档-词矩阵（按 config.TOPIC_DOCUMENT_UNIT 以句子或场景为文档），
+    不存在时退回将词列表按 chunk_words 个连续词切块
+    :param words: 词列表（仅在没有文档-词矩阵时使用）
+    :param path: document_term_matrix.npz 路径
+    :param chunk_words: 每个词块的词数
+    :return: (DocumentTermMatrix 对象, 文档单位)
+    """
+    if os.path.exists(path):
+        return load_document_matrix(path), config.TOPIC_DOCUMENT_UNIT
+    return chunk_documents(words, chunk_words), "chunk"
+
+
+def topic_documents(matrix, unit=config.TOPIC_DOCUMENT_UNIT):
+    """
+    按文档单位取出“文档 × 词表”矩阵，去掉空文档
+    :param matrix: DocumentTermMatrix 对象
+    :param unit: "sentence"（每句一个文档）、"scene"（同一部分同一场景的句子合并为一个文档）
+                 或 "chunk"（chunk_documents 切出的每个词块一个文档）
+    :return: CSR 矩阵
+    """
+    if unit in ("sentence", "chunk"):
+        documents = matrix.matrix
+    elif unit == "scene":
+        _, documents = matrix.aggregate(("part", "scene"))
+    else:
+        raise ValueError(f"未知的文档单位: {unit}")
+    return documents[np.diff(documents.indptr) > 0]
+
+
+def corpus_digest(documents, vocab):
+    """
+    计算词袋语料的内容哈希（矩阵结构、计数和词表）
+    :return: 十六进制哈希字符串
+    """
+    digest = hashlib.sha256()
+    for array in (documents.indptr, documents.indices, documents.data):
+        digest.update(np.ascontiguousarray(array, dtype=np.int64).tobytes())
+    digest.update("\n".join(vocab).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def serialize_corpus(documents, id2word, path):
+    """
+    将词袋语料写成 Matrix Market 文件（已存在则直接复用），返回可流式读取的 MmCorpus
+    :param documents: “文档 × 词表” CSR 矩阵
+    :param id2word: {词 id: 词}
+    :param path: .mm 文件路径
+    """
+    if not os.path.exists(path):
+        # 先写临时文件再改名，中断的运行不会留下不完整的语料
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        corpora.MmCorpus.serialize(tmp_path, Sparse2Corpus(documents, documents_columns=False), id2word=id2word)
+        os.replace(f"{tmp_path}.index", f"{path}.index")
+        os.replace(tmp_path, path)
+    return corpora.MmCorpus(path)
+
+
+def train_topic_model(matrix, num_topics=3, unit=config.TOPIC_DOCUMENT_UNIT, passes=config.TOPIC_PASSES,
+                      workers=config.TOPIC_WORKERS, random_state=config.TOPIC_RANDOM_STATE,
+                      cache_dir=config.TOPIC_CACHE_PATH):
+    """
+    训练（或从缓存读取）LDA 主题模型
+    :param matrix: DocumentTermMatrix 对象
+    :param num_topics: 主题数
+    :param unit: 文档单位，见 topic_documents
+    :param passes: 训练轮数
+    :param workers: LdaMulticore 工作进程数
+    :param random_state: 随机种子
+    :param cache_dir: 语料与模型缓存目录
+    :return: 训练好的 LDA 模型
+    """
+    documents = topic_documents(matrix, unit)
+    digest = corpus_digest(documents, matrix.vocab)
+    # 语料哈希与训练参数共同决定模型缓存键
+    settings = {"corpus": digest, "num_topics": num_topics, "passes": passes,
+                "random_state": random_state, "gensim": gensim.__version__}
+    key = hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    model_path = os.path.join(cache_dir, f"lda-{key}.model")
+    if os.path.exists(model_path):
+        print(f"[topics] 语料未变化，复用 {model_path}")
+        return models.LdaMulticore.load(model_path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    id2word = dict(enumerate(matrix.vocab))
+    corpus = serialize_corpus(documents, id2word, os.path.join(cache_dir, f"corpus-{digest[:16]}.mm"))
+    print(f"[topics] 训练 LDA：{documents.shape[0]} 个文档（{unit}），{num_topics} 个主题...")
+    lda_model = models.LdaMulticore(corpus, num_topics=num_topics, id2word=id2word, passes=passes,
+                                    workers=workers, random_state=random_state)
+    lda_model.save(model_path)
+    return lda_model
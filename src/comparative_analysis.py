@@ -1,123 +1,136 @@
 import os
-import numpy as np
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from rendering import Figure, render_figures, bar_chart, grouped_bar_chart, trend_chart
+
+SEGMENT_LABELS = {"part_one": "Lawyer (Part One)", "part_two": "Victim (Part Two)"}
+
+def build_analyzers(legal_terms,
+                    calculate_lexical_diversity,
+                    analyze_legal_terminology,
+                    analyze_sentence_structure,
+                    analyze_emotion_expression,
+                    analyze_trauma_markers):
+    return {
+        "lexical_diversity": calculate_lexical_diversity,
+        "legal_terms": partial(analyze_legal_terminology, legal_terms=legal_terms),
+        "sentence_structure": analyze_sentence_structure,
+        "emotion": analyze_emotion_expression,
+        "trauma_markers": analyze_trauma_markers
+    }
+
+def compare_segments(segments, analyzers, workers=1, prepare=None, initializer=None, initargs=()):
+    """Runs every analyzer on every named segment (scenes, parts or whole documents)."""
+    if workers <= 1:
+        return {name: {key: analyze(text) for key, analyze in analyzers.items()}
+                for name, text in segments.items()}
+    # Each worker loads its models once (via initializer / module import) and serves many jobs
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        if prepare is not None:
+            # Parse every segment once up front so analyzer jobs reuse the cached parse
+            list(pool.map(prepare, segments.values()))
+        jobs = {(name, key): pool.submit(analyze, text)
+                for name, text in segments.items() for key, analyze in analyzers.items()}
+        return {name: {key: jobs[(name, key)].result() for key in analyzers} for name in segments}
 
 def compare_parts(text_data, legal_terms,
                  calculate_lexical_diversity,
                  analyze_legal_terminology,
                  analyze_sentence_structure,
                  analyze_emotion_expression,
-                 analyze_trauma_markers):
-    results = {}
-    # Part One
-    results["part_one"] = {
-        "lexical_diversity": calculate_lexical_diversity(text_data["part_one"]),
-        "legal_terms": analyze_legal_terminology(text_data["part_one"], legal_terms),
-        "sentence_structure": analyze_sentence_structure(text_data["part_one"]),
-        "emotion": analyze_emotion_expression(text_data["part_one"]),
-        "trauma_markers": analyze_trauma_markers(text_data["part_one"])
-    }
-    # Part Two
-    results["part_two"] = {
-        "lexical_diversity": calculate_lexical_diversity(text_data["part_two"]),
-        "legal_terms": analyze_legal_terminology(text_data["part_two"], legal_terms),
-        "sentence_structure": analyze_sentence_structure(text_data["part_two"]),
-        "emotion": analyze_emotion_expression(text_data["part_two"]),
-        "trauma_markers": analyze_trauma_markers(text_data["part_two"])
-    }
-    return results
+                 analyze_trauma_markers,
+                 workers=1, prepare=None, initializer=None, initargs=()):
+    analyzers = build_analyzers(
+        legal_terms, calculate_lexical_diversity, analyze_legal_terminology,
+        analyze_sentence_structure, analyze_emotion_expression, analyze_trauma_markers
+    )
+    segments = {"part_one": text_data["part_one"], "part_two": text_data["part_two"]}
+    return compare_segments(segments, analyzers, workers, prepare, initializer, initargs)
 
-def visualize_comparison(comparison_results, output_dir, legal_terms):
-    os.makedirs(output_dir, exist_ok=True)
-    parts = ["part_one", "part_two"]
-
-    # Lexical Diversity
-    plt.figure(figsize=(8, 5))
-    ttr_values = [comparison_results[p]["lexical_diversity"]["ttr"] for p in parts]
-    plt.bar(["Lawyer (Part One)", "Victim (Part Two)"], ttr_values)
-    plt.title("Lexical Diversity (TTR)")
-    plt.ylabel("Type-Token Ratio")
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, "lexical_diversity.png"))
-    plt.close()
-
-    # Legal Terms (top 10)
-    plt.figure(figsize=(10, 6))
-    top_terms = sorted(
-        [(term, comparison_results["part_one"]["legal_terms"][term]["frequency"])
-         for term in legal_terms],
-        key=lambda x: x[1],
-        reverse=True
-    )[:10]
-    terms = [t[0] for t in top_terms]
-    p1_freq = [comparison_results["part_one"]["legal_terms"][t]["frequency"]*1000 for t in terms]
-    p2_freq = [comparison_results["part_two"]["legal_terms"][t]["frequency"]*1000 for t in terms]
-    x = np.arange(len(terms))
-    width = 0.35
-    plt.bar(x - width/2, p1_freq, width, label="Lawyer (Part One)")
-    plt.bar(x + width/2, p2_freq, width, label="Victim (Part Two)")
-    plt.xlabel("Legal Term")
-    plt.ylabel("Frequency (per 1000 words)")
-    plt.title("Legal Terms Usage")
-    plt.xticks(x, terms, rotation=45, ha="right")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, "legal_terms.png"))
-    plt.close()
+def _flatten(prefix, value, features):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, item, features)
+    else:
+        features[prefix] = float(value)
+
+def feature_matrix(comparison_results):
+    """Flattens per-segment results into a features x segments DataFrame.
+
+    Rows are dotted feature names such as "lexical_diversity.ttr" or
+    "legal_terms.consent.frequency"; columns keep the segment order.
+    """
+    import pandas as pd
+    columns = {}
+    for segment, groups in comparison_results.items():
+        features = {}
+        _flatten("", groups, features)
+        columns[segment] = features
+    return pd.DataFrame(columns)
+
+def segment_labels(matrix):
+    return [SEGMENT_LABELS.get(segment, segment) for segment in matrix.columns]
+
+def _grouped_bars(matrix, features, tick_labels, title, xlabel, ylabel, path, scale=1, figsize=(8, 5), rotation=0):
+    series = [(label, (matrix.loc[features, segment].to_numpy() * scale).tolist())
+              for segment, label in zip(matrix.columns, segment_labels(matrix))]
+    return Figure(path, grouped_bar_chart, tick_labels=list(tick_labels), series=series, title=title,
+                  xlabel=xlabel, ylabel=ylabel, figsize=figsize, rotation=rotation)
+
+def comparison_figures(matrix, output_dir, legal_terms):
+    """Figure specs (plain data only) for the comparison plots; see rendering.render_figures."""
+    figures = [
+        # Lexical Diversity
+        Figure(os.path.join(output_dir, "lexical_diversity.png"), bar_chart,
+               labels=segment_labels(matrix), values=matrix.loc["lexical_diversity.ttr"].tolist(),
+               title="Lexical Diversity (TTR)", ylabel="Type-Token Ratio")
+    ]
+
+    # Legal Terms (top 10 in the first segment)
+    frequencies = matrix.loc[[f"legal_terms.{term}.frequency" for term in dict.fromkeys(legal_terms)]]
+    top = frequencies.iloc[:, 0].sort_values(ascending=False, kind="stable").index[:10]
+    terms = [feature[len("legal_terms."):-len(".frequency")] for feature in top]
+    figures.append(_grouped_bars(matrix, list(top), terms, "Legal Terms Usage", "Legal Term", "Frequency (per 1000 words)",
+                                 os.path.join(output_dir, "legal_terms.png"), scale=1000, figsize=(10, 6), rotation=45))
 
     # Sentence Structure
-    plt.figure(figsize=(8, 5))
-    metrics = ["avg_length", "complex_sentence_rate", "fragment_rate"]
-    labels = ["Avg Sentence Length", "Complex Sentences", "Fragments"]
-    p1_values = [comparison_results["part_one"]["sentence_structure"][m] for m in metrics]
-    p2_values = [comparison_results["part_two"]["sentence_structure"][m] for m in metrics]
-    x = np.arange(len(metrics))
-    width = 0.35
-    plt.bar(x - width/2, p1_values, width, label="Lawyer (Part One)")
-    plt.bar(x + width/2, p2_values, width, label="Victim (Part Two)")
-    plt.xlabel("Syntactic Metric")
-    plt.ylabel("Value")
-    plt.title("Sentence Structure Comparison")
-    plt.xticks(x, labels)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, "sentence_structure.png"))
-    plt.close()
+    figures.append(_grouped_bars(matrix,
+                                 ["sentence_structure.avg_length", "sentence_structure.complex_sentence_rate",
+                                  "sentence_structure.fragment_rate"],
+                                 ["Avg Sentence Length", "Complex Sentences", "Fragments"],
+                                 "Sentence Structure Comparison", "Syntactic Metric", "Value",
+                                 os.path.join(output_dir, "sentence_structure.png")))
 
     # Emotion
-    plt.figure(figsize=(8, 5))
-    metrics = ["avg_sentiment", "sentiment_variation", "emotional_intensity"]
-    labels = ["Avg Sentiment", "Variation", "Intensity"]
-    p1_values = [comparison_results["part_one"]["emotion"][m] for m in metrics]
-    p2_values = [comparison_results["part_two"]["emotion"][m] for m in metrics]
-    x = np.arange(len(metrics))
-    width = 0.35
-    plt.bar(x - width/2, p1_values, width, label="Lawyer (Part One)")
-    plt.bar(x + width/2, p2_values, width, label="Victim (Part Two)")
-    plt.xlabel("Emotion Metric")
-    plt.ylabel("Value")
-    plt.title("Emotion Expression Comparison")
-    plt.xticks(x, labels)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, "emotion_expression.png"))
-    plt.close()
+    figures.append(_grouped_bars(matrix,
+                                 ["emotion.avg_sentiment", "emotion.sentiment_variation", "emotion.emotional_intensity"],
+                                 ["Avg Sentiment", "Variation", "Intensity"],
+                                 "Emotion Expression Comparison", "Emotion Metric", "Value",
+                                 os.path.join(output_dir, "emotion_expression.png")))
 
     # Trauma Markers
-    plt.figure(figsize=(10, 5))
-    metrics = ["tense_shift_rate", "repetition_rate", "sensory_rate", "disruption_rate"]
-    labels = ["Tense Shift", "Repetition", "Sensory", "Disruption"]
-    p1_values = [comparison_results["part_one"]["trauma_markers"][m] for m in metrics]
-    p2_values = [comparison_results["part_two"]["trauma_markers"][m] for m in metrics]
-    x = np.arange(len(metrics))
-    width = 0.35
-    plt.bar(x - width/2, p1_values, width, label="Lawyer (Part One)")
-    plt.bar(x + width/2, p2_values, width, label="Victim (Part Two)")
-    plt.xlabel("Trauma Marker")
-    plt.ylabel("Rate")
-    plt.title("Trauma Markers Comparison")
-    plt.xticks(x, labels)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, "trauma_markers.png"))
-    plt.close()
+    figures.append(_grouped_bars(matrix,
+                                 ["trauma_markers.tense_shift_rate", "trauma_markers.repetition_rate",
+                                  "trauma_markers.sensory_rate", "trauma_markers.disruption_rate"],
+                                 ["Tense Shift", "Repetition", "Sensory", "Disruption"],
+                                 "Trauma Markers Comparison", "Trauma Marker", "Rate",
+                                 os.path.join(output_dir, "trauma_markers.png"), figsize=(10, 5)))
+    return figures
+
+def trend_figure(sentence, token, output_dir):
+    """Sliding-window trends (see linguistic_analysis.sentence_trends / token_trends) as one stacked chart."""
+    return Figure(os.path.join(output_dir, "trends.png"), trend_chart, title="Sliding-Window Trends", panels=[
+        ("Sentiment (mean ± std)", "Sentence", sentence["start"], sentence["sentiment_mean"], sentence["sentiment_std"]),
+        ("Disruptions per sentence", "Sentence", sentence["start"], sentence["disruption_rate"], None),
+        ("TTR", "Content word", token["ttr_start"], token["ttr"], None),
+        ("Legal terms per word", "Word", token["legal_start"], token["legal_density"], None)
+    ])
+
+def visualize_comparison(matrix, output_dir, legal_terms, workers=1, force=False, trends=None):
+    """Renders the comparison plots (and the trend chart, given trends=(sentence, token)),
+    skipping any whose data is unchanged since the last run."""
+    os.makedirs(output_dir, exist_ok=True)
+    figures = comparison_figures(matrix, output_dir, legal_terms)
+    if trends is not None:
+        figures.append(trend_figure(*trends, output_dir))
+    return render_figures(figures, workers, force)
@@ -0,0 +1,124 @@
+import os
+import glob
+import hashlib
+from collections import OrderedDict
+
+def text_chunks(text, size):
+    """Splits text into consecutive pieces of at most size characters, cutting before a
+    paragraph break, line break or space where possible."""
+    start = 0
+    while len(text) - start > size:
+        end = start + size
+        for separator in ("\n\n", "\n", " "):
+            cut = text.rfind(separator, start + 1, end)
+            if cut > start:
+                break
+        else:
+            cut = end
+        yield text[start:cut]
+        start = cut
+    yield text[start:]
+
+class DocumentCache:
+    """Parses each distinct text once per run and persists parses as spaCy DocBin files.
+
+    nlp may be a loaded pipeline or a zero-argument callable returning one, so the
+    model is only loaded when the first text is parsed. max_docs bounds the parses kept
+    in memory and max_files the DocBin files kept on disk (least recently used go first);
+    both are unbounded by default, as a batch run holds only a few documents.
+    """
+
+    def __init__(self, nlp, cache_dir=None, max_docs=None, max_files=None):
+        self._nlp = nlp
+        self.cache_dir = cache_dir
+        self.max_docs = max_docs
+        self.max_files = max_files
+        self._docs = OrderedDict()
+
+    @property
+    def nlp(self):
+        if not hasattr(self._nlp, "pipe_names"):
+            self._nlp = self._nlp()
+        return self._nlp
+
+    @property
+    def model_version(self):
+        meta = self.nlp.meta
+        return f"{meta.get('lang', 'xx')}_{meta.get('name', 'pipeline')}-{meta.get('version', '0')}"
+
+    def key(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_version}-{digest}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.spacy")
+
+    def _load(self, key):
+        from spacy.tokens import DocBin
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            docs = list(DocBin().from_disk(path).get_docs(self.nlp.vocab))
+            if self.max_files:
+                os.utime(path)  # marks the file as recently used for _prune
+        except (OSError, ValueError):
+            return None
+        return docs[0] if docs else None
+
+    def _prune(self):
+        paths = glob.glob(os.path.join(self.cache_dir, "*.spacy"))
+        if len(paths) <= self.max_files:
+            return
+        def mtime(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0
+        for path in sorted(paths, key=mtime)[:len(paths) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:  # already removed by another process
+                pass
+
+    def _save(self, key, doc):
+        from spacy.tokens import DocBin
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write to a temporary file first so concurrent runs never see a partial DocBin
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        DocBin(store_user_data=True, docs=[doc]).to_disk(tmp_path)
+        os.replace(tmp_path, self._path(key))
+        if self.max_files:
+            self._prune()
+
+    def _parse(self, text):
+        nlp = self.nlp
+        if len(text) <= nlp.max_length:
+            return nlp(text)
+        from spacy.tokens import Doc
+        # Longer texts are parsed in pieces and joined into one Doc with the original text and offsets
+        return Doc.from_docs(list(nlp.pipe(text_chunks(text, nlp.max_length))), ensure_whitespace=False)
+
+    def parse(self, text):
+        if not isinstance(text, str):  # already a parsed Doc
+            return text
+        key = self.key(text)
+        doc = self._docs.get(key)
+        if doc is not None:
+            self._docs.move_to_end(key)
+            return doc
+        doc = self._load(key)
+        if doc is None:
+            doc = self._parse(text)
+            self._save(key, doc)
+        self._docs[key] = doc
+        while self.max_docs and len(self._docs) > self.max_docs:
+            self._docs.popitem(last=False)
+        return doc
+
+    def clear(self):
+        self._docs.clear()
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+logger = logging.getLogger("prima_facie.trace")
+
+MB = 1024 * 1024
+
+class Span:
+    def __init__(self, name, parent, depth, items=None):
+        self.name = name
+        self.parent = parent
+        self.depth = depth
+        self.items = items
+        self.start = 0.0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak = 0
+        self.child_peak = 0
+
+    def as_dict(self, origin):
+        return {
+            "name": self.name,
+            "parent": self.parent,
+            "depth": self.depth,
+            "start_s": self.start - origin,
+            "wall_s": self.wall,
+            "cpu_s": self.cpu,
+            "peak_mb": self.peak / MB if self.peak is not None else None,
+            "items": self.items,
+            "items_per_s": self.items / self.wall if self.items and self.wall > 0 else None
+        }
+
+class Tracer:
+    """Records nested spans (wall time, CPU time, tracemalloc peak, items/sec) for one process.
+
+    Spans are only recorded between start() and stop(); outside that window span() and
+    @traced cost a single attribute check, so pool workers run untraced.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.spans = []
+        self.origin = 0.0
+        self.started_at = None
+        self._owns_tracemalloc = False
+        self._local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def start(self, memory=False):
+        self.enabled = True
+        self.spans = []
+        self.origin = time.perf_counter()
+        self.started_at = datetime.now()
+        self.memory = memory
+        self._owns_tracemalloc = memory and not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+
+    def stop(self):
+        self.enabled = False
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    @contextmanager
+    def span(self, name, items=None):
+        if not self.enabled:
+            yield None
+            return
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        span = Span(name, parent.name if parent else None, len(stack), items)
+        base = 0
+        if self.memory:
+            # tracemalloc keeps one global peak: fold the parent's peak so far into it before resetting
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent.child_peak = max(parent.child_peak, peak)
+            tracemalloc.reset_peak()
+            base = current
+        stack.append(span)
+        span.start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield span
+        finally:
+            span.wall = time.perf_counter() - span.start
+            span.cpu = time.process_time() - cpu_start
+            stack.pop()
+            if self.memory:
+                peak = max(tracemalloc.get_traced_memory()[1], span.child_peak)
+                span.peak = peak - base
+                if parent is not None:
+                    parent.child_peak = max(parent.child_peak, peak)
+            else:
+                span.peak = None
+            self.spans.append(span)
+            logger.debug("%s: %.3fs wall, %.3fs cpu", name, span.wall, span.cpu)
+
+    def summary(self):
+        totals = {}
+        for span in self.spans:
+            entry = totals.setdefault(span.name, {"count": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_mb": None, "items": 0})
+            entry["count"] += 1
+            entry["wall_s"] += span.wall
+            entry["cpu_s"] += span.cpu
+            entry["items"] += span.items or 0
+            if span.peak is not None:
+                entry["peak_mb"] = max(entry["peak_mb"] or 0, span.peak / MB)
+        for entry in totals.values():
+            entry["items_per_s"] = entry["items"] / entry["wall_s"] if entry["items"] and entry["wall_s"] > 0 else None
+        return totals
+
+    def save(self, log_dir, name="trace", chrome=False):
+        """Writes <log_dir>/<name>-<timestamp>.json (and a Chrome trace-event file when chrome=True)."""
+        os.makedirs(log_dir, exist_ok=True)
+        stamp = (self.started_at or datetime.now()).strftime("%Y%m%d-%H%M%S")
+        spans = sorted(self.spans, key=lambda span: span.start)
+        path = os.path.join(log_dir, f"{name}-{stamp}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "started": (self.started_at or datetime.now()).isoformat(timespec="seconds"),
+                "pid": os.getpid(),
+                "memory_traced": self.memory,
+                "spans": [span.as_dict(self.origin) for span in spans],
+                "summary": self.summary()
+            }, f, indent=2)
+        logger.info("Trace saved to %s", path)
+        paths = [path]
+        if chrome:
+            # Complete ("X") events in microseconds; open in chrome://tracing or Perfetto
+            events = [{
+                "name": span.name, "ph": "X", "pid": os.getpid(), "tid": 0,
+                "ts": (span.start - self.origin) * 1e6, "dur": span.wall * 1e6,
+                "args": {key: value for key, value in span.as_dict(self.origin).items()
+                         if key in ("cpu_s", "peak_mb", "items", "items_per_s")}
+            } for span in spans]
+            chrome_path = os.path.join(log_dir, f"{name}-{stamp}.chrome.json")
+            with open(chrome_path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+            logger.info("Chrome trace saved to %s", chrome_path)
+            paths.append(chrome_path)
+        return paths
+
+tracer = Tracer()
+
+def span(name, items=None):
+    return tracer.span(name, items)
+
+def traced(name=None, items=None):
+    """Decorator recording a span per call; items(*args, **kwargs) returns the work size (e.g. words)."""
+    def decorate(func):
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(label, items(*args, **kwargs) if items else None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+@contextmanager
+def trace_run(name, log_dir=None, chrome=False, memory=False):
+    """Traces everything inside the block as one run and saves the trace to log_dir (no-op without log_dir)."""
+    if not log_dir:
+        yield
+        return
+    tracer.start(memory)
+    try:
+        with tracer.span(name):
+            yield
+    finally:
+        tracer.stop()
+        tracer.save(log_dir, name, chrome)
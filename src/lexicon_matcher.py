@@ -0,0 +1,148 @@
+import re
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_TERM = ""  # trie key marking the end of a term; never produced by TOKEN_PATTERN
+
+def tokenize_term(term):
+    return TOKEN_PATTERN.findall(term.lower())
+
+class LexiconMatcher:
+    """Token-trie matcher that finds every (multi-word) lexicon term in one pass over a text.
+
+    Terms and text are tokenized the same way, so matches always start and end on
+    token boundaries ("act" does not match inside "fact"). Overlapping terms such as
+    "reasonable doubt" and "beyond reasonable doubt" are all reported, and the number
+    of partial matches kept alive is bounded by the longest term, so the cost grows
+    with the length of the text rather than with the size of the lexicon.
+    """
+
+    def __init__(self, terms):
+        self.terms = list(dict.fromkeys(terms))
+        self._trie = {}
+        for term in self.terms:
+            node = self._trie
+            for token in tokenize_term(term):
+                node = node.setdefault(token, {})
+            if node is not self._trie:
+                node.setdefault(_TERM, term)
+
+    def finditer(self, text):
+        """Yields (term, start, end) for every match; offsets refer to text.lower().
+
+        text may also be a TokenStore, in which case its token ids are matched directly
+        and offsets come from the store.
+        """
+        if not isinstance(text, str):
+            yield from self._finditer_store(text)
+            return
+        active = []
+        for match in TOKEN_PATTERN.finditer(text.lower()):
+            token = match.group()
+            advanced = []
+            for start, node in active + [(match.start(), self._trie)]:
+                child = node.get(token)
+                if child is None:
+                    continue
+                term = child.get(_TERM)
+                if term is not None:
+                    yield term, start, match.end()
+                if len(child) > (term is not None):
+                    advanced.append((start, child))
+            active = advanced
+
+    def _finditer_store(self, store):
+        # Re-key the trie by this store's vocabulary ids; terms with an unseen token cannot match
+        def to_ids(node):
+            id_node = {}
+            for token, child in node.items():
+                if token == _TERM:
+                    id_node[_TERM] = child
+                elif token in store.vocab_index:
+                    id_node[store.vocab_index[token]] = to_ids(child)
+            return id_node
+        id_trie = to_ids(self._trie)
+        if not id_trie:
+            return
+        # Whitespace tokens (line breaks, runs of spaces) are skipped, as TOKEN_PATTERN skips them in text
+        positions = np.flatnonzero(~store.space_mask)
+        ids = store.ids[positions]
+        # Only positions holding a first term token are walked
+        is_first = np.zeros(len(store.vocab), dtype=bool)
+        is_first[list(id_trie)] = True
+        for i in np.flatnonzero(is_first[ids]).tolist():
+            node = id_trie
+            j = i
+            while j < len(ids):
+                node = node.get(int(ids[j]))
+                if node is None:
+                    break
+                term = node.get(_TERM)
+                if term is not None:
+                    yield term, int(store.starts[positions[i]]), int(store.ends[positions[j]])
+                j += 1
+
+    def matches(self, text):
+        results = {term: {"count": 0, "offsets": []} for term in self.terms}
+        for term, start, end in self.finditer(text):
+            results[term]["count"] += 1
+            results[term]["offsets"].append((start, end))
+        return results
+
+    def count(self, text):
+        counts = dict.fromkeys(self.terms, 0)
+        for term, _, _ in self.finditer(text):
+            counts[term] += 1
+        return counts
+
+    def contains(self, text, minimum=1):
+        found = 0
+        for _ in self.finditer(text):
+            found += 1
+            if found >= minimum:
+                return True
+        return False
+
+class PatternMatcher:
+    """Counts regex markers (e.g. "...", "--") in a text or a token store.
+
+    Markers are found anywhere inside a token, so they count whether they stand alone
+    ("--") or are attached to a word ("A--", "I—"). In a token store each vocabulary
+    type is searched once, so counting is a lookup per token.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = tuple(patterns)
+        self._pattern = re.compile("|".join(f"(?:{pattern})" for pattern in self.patterns)) if self.patterns else None
+
+    def type_counts(self, vocab):
+        """Number of marker matches in each vocabulary type."""
+        if self._pattern is None:
+            return np.zeros(len(vocab), dtype=np.int64)
+        return np.fromiter((sum(1 for _ in self._pattern.finditer(word)) for word in vocab),
+                           dtype=np.int64, count=len(vocab))
+
+    def count(self, text):
+        """Total number of marker matches; text may be a string or a TokenStore."""
+        if self._pattern is None:
+            return 0
+        if isinstance(text, str):
+            return sum(1 for _ in self._pattern.finditer(text))
+        return int(self.type_counts(text.vocab)[text.ids].sum())
+
+_matchers = {}
+
+def _cached(cls, terms):
+    key = tuple(sorted(terms)) if isinstance(terms, (set, frozenset)) else tuple(terms)
+    matcher = _matchers.get((cls, key))
+    if matcher is None:
+        matcher = _matchers[(cls, key)] = cls(key)
+    return matcher
+
+def get_matcher(terms):
+    """Returns a compiled matcher for terms, reusing it across calls with the same lexicon."""
+    return _cached(LexiconMatcher, terms)
+
+def get_pattern_matcher(patterns):
+    """Returns a compiled PatternMatcher for patterns, reusing it across calls."""
+    return _cached(PatternMatcher, patterns)
@@ -1,34 +1,122 @@
-import re
-from collections import Counter
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.sentiment import SentimentIntensityAnalyzer
+import os
+from collections import OrderedDict
 import numpy as np
-import spacy
+import resources
+from instrumentation import traced
+from document_cache import DocumentCache
+from lexicon_matcher import get_matcher, get_pattern_matcher
+from token_store import TokenStore
+from sentiment_scorer import SentimentScorer
+from sliding_window import (
+    SENTENCE_WINDOW, SENTENCE_STRIDE, TOKEN_WINDOW, TOKEN_STRIDE,
+    window_starts, rolling_mean_std, rolling_rate, rolling_ttr, mattr, mtld
+)
 
-nlp = spacy.load("en_core_web_sm")
-stop_words = set(stopwords.words('english'))
-sia = SentimentIntensityAnalyzer()
+# Models load on first use through the resource registry, not at import time
+doc_cache = DocumentCache(lambda: resources.get("spacy"))
+sentiment_scorer = SentimentScorer(lambda: resources.get("vader"))
+_token_stores = OrderedDict()
 
+# Trauma-marker lexicons: sensory words match whole tokens, disruption markers match inside tokens ("A--" counts)
+SENSORY_WORDS = ("see", "hear", "feel", "smell", "taste", "touch",
+                 "saw", "heard", "felt", "body", "pain", "numb")
+DISRUPTION_MARKERS = (r"\.{3,}", r"…+", r"—+", r"-{2,}")
+PAST_TAGS = ("VBD", "VBN")
+PRESENT_TAGS = ("VBZ", "VBP", "VB")
+
+def configure_parse_cache(cache_dir):
+    doc_cache.cache_dir = cache_dir
+
+def configure_caches(cache_dir, max_docs=None, max_files=None):
+    # max_docs / max_files bound the in-memory parses (and token stores) and the DocBin files on disk
+    configure_parse_cache(cache_dir)
+    doc_cache.max_docs = max_docs
+    doc_cache.max_files = max_files
+    if cache_dir:
+        sentiment_scorer.load(os.path.join(cache_dir, "vader_scores.json"))
+
+def configure_sentiment(workers=1, parallel_threshold=5_000):
+    # Opt-in: large sentiment batches scored in this process are split across worker processes
+    sentiment_scorer.workers = workers
+    sentiment_scorer.parallel_threshold = parallel_threshold
+
+def save_caches():
+    # Writes new sentiment scores to disk; called once at the end of a run or when a worker exits
+    sentiment_scorer.save()
+    sentiment_scorer.close()
+
+def clear_parses():
+    # Drops in-memory parses and token stores (DocBin files on disk are kept)
+    doc_cache.clear()
+    _token_stores.clear()
+
+def clear_caches():
+    # Drops in-memory parses, token stores and sentiment scores (on-disk caches are kept)
+    clear_parses()
+    sentiment_scorer.clear()
+
+def init_worker(cache_dir, max_docs=None, max_files=None):
+    # Pool initializer: configure caches and load every model once per worker process
+    from multiprocessing.util import Finalize
+    configure_caches(cache_dir, max_docs, max_files)
+    # Pool workers skip atexit handlers; multiprocessing finalizers still run when the pool shuts down
+    Finalize(None, save_caches, exitpriority=10)
+    resources.warm_up("spacy", "vader", "stopwords", "sent_tokenize")
+
+def word_count(text, *args, **kwargs):
+    # Work size reported to the tracer (items/sec)
+    return len(text.split()) if isinstance(text, str) else len(text)
+
+@traced(items=word_count)
+def parse(text):
+    return doc_cache.parse(text)
+
+def token_store(text):
+    doc = parse(text)
+    key = doc_cache.key(doc.text)
+    store = _token_stores.get(key)
+    if store is None:
+        store = _token_stores[key] = TokenStore.from_doc(doc, resources.get("stopwords"))
+        while doc_cache.max_docs and len(_token_stores) > doc_cache.max_docs:
+            _token_stores.popitem(last=False)
+    else:
+        _token_stores.move_to_end(key)
+    return store
+
+def score_sentences(sentences):
+    # VADER rows (columns sentiment_scorer.SCORE_FIELDS) through the shared LRU cache
+    return sentiment_scorer.score(sentences)
+
+def prepare_segment(text):
+    # Parses (and persists) text in the calling process; used to warm pool workers
+    token_store(text)
+
+@traced(items=word_count)
 def calculate_lexical_diversity(text):
-    words = word_tokenize(text.lower())
-    words = [w for w in words if w.isalpha() and w not in stop_words]
-    if not words:
-        return {"ttr": 0, "unique_words": 0, "total_words": 0}
-    unique_words = set(words)
-    return {"ttr": len(unique_words)/len(words), "unique_words": len(unique_words), "total_words": len(words)}
+    store = token_store(text)
+    type_counts = store.type_counts(store.content_mask)
+    total_words = int(type_counts.sum())
+    if not total_words:
+        return {"ttr": 0, "mattr": 0, "mtld": 0, "unique_words": 0, "total_words": 0}
+    unique_words = int(np.count_nonzero(type_counts))
+    content_ids = store.ids[store.content_mask]
+    return {"ttr": unique_words/total_words, "mattr": mattr(content_ids), "mtld": mtld(content_ids),
+            "unique_words": unique_words, "total_words": total_words}
 
+@traced(items=word_count)
 def analyze_legal_terminology(text, legal_terms):
-    text_lower = text.lower()
-    total_words = len([w for w in word_tokenize(text_lower) if w.isalpha()])
+    store = token_store(text)
+    total_words = int(np.count_nonzero(store.alpha_mask))
+    counts = get_matcher(legal_terms).count(store)
     results = {}
     for term in legal_terms:
-        count = text_lower.count(term.lower())
+        count = counts[term]
         results[term] = {"count": count, "frequency": count/total_words if total_words > 0 else 0}
     return results
 
+@traced(items=word_count)
 def analyze_sentence_structure(text):
-    doc = nlp(text)
+    doc = parse(text)
     sentences = list(doc.sents)
     if not sentences:
         return {"avg_length": 0, "complex_sentence_rate": 0, "fragment_rate": 0}
@@ -41,49 +129,100 @@ def analyze_sentence_structure(text):
         "fragment_rate": fragments/len(sentences)
     }
 
+@traced(items=word_count)
 def analyze_emotion_expression(text):
-    sentences = sent_tokenize(text)
+    sentences = resources.get("sent_tokenize")(text)
     if not sentences:
         return {"avg_sentiment": 0, "sentiment_variation": 0, "emotional_intensity": 0}
-    sentiment_scores = [sia.polarity_scores(s)["compound"] for s in sentences]
+    sentiment_scores = sentiment_scorer.score(sentences)[:, 0]
     avg_sentiment = np.mean(sentiment_scores)
     sentiment_variation = np.std(sentiment_scores)
-    emotional_intensity = np.mean([abs(s) for s in sentiment_scores])
+    emotional_intensity = np.mean(np.abs(sentiment_scores))
     return {
         "avg_sentiment": avg_sentiment,
         "sentiment_variation": sentiment_variation,
         "emotional_intensity": emotional_intensity
     }
 
-def analyze_trauma_markers(text):
-    doc = nlp(text)
-    tense_shifts = 0
-    for sent in doc.sents:
-        tenses = set()
-        for token in sent:
-            if token.pos_ == "VERB":
-                if token.tag_ in ["VBD", "VBN"]:
-                    tenses.add("past")
-                elif token.tag_ in ["VBZ", "VBP", "VB"]:
-                    tenses.add("present")
-        if len(tenses) > 1:
-            tense_shifts += 1
-    words = [w.lower() for w in word_tokenize(text) if w.isalpha()]
-    word_counts = Counter(words)
-    repetitions = sum(1 for word, count in word_counts.items() if count > 3 and word not in stop_words)
-    sensory_words = ["see", "hear", "feel", "smell", "taste", "touch",
-                     "saw", "heard", "felt", "body", "pain", "numb"]
-    sensory_count = sum(text.lower().count(word) for word in sensory_words)
-    ellipses = len(re.findall(r'\.{3}|…', text))
-    dashes = len(re.findall(r'—|--', text))
-    total_words = len([w for w in words if w not in stop_words])
+@traced(items=word_count)
+def analyze_trauma_markers(text, sensory_words=SENSORY_WORDS, disruption_markers=DISRUPTION_MARKERS):
+    """Tense shifts, repetitions, sensory words and disruption markers from one pass over the parse.
+
+    sensory_words are matched as whole tokens (multi-word entries allowed); disruption_markers
+    are regular expressions counted inside tokens, so markers attached to a word ("I—") count too.
+    """
+    from spacy.attrs import POS, TAG
+    from spacy.symbols import VERB
+    doc = parse(text)
+    store = token_store(doc)
+    sentence_starts = np.array([sent.start for sent in doc.sents], dtype=np.int64)
+    n_sentences = len(sentence_starts)
+    # Tense shift: a sentence with both past and present verbs
+    attrs = doc.to_array([POS, TAG]) if len(doc) else np.zeros((0, 2), dtype=np.uint64)
+    is_verb = attrs[:, 0] == VERB
+    past = is_verb & np.isin(attrs[:, 1], [doc.vocab.strings[tag] for tag in PAST_TAGS])
+    present = is_verb & np.isin(attrs[:, 1], [doc.vocab.strings[tag] for tag in PRESENT_TAGS])
+    sentence_of = np.searchsorted(sentence_starts, np.arange(len(doc)), side="right") - 1
+    tense_shifts = int(np.count_nonzero(
+        (np.bincount(sentence_of[past], minlength=n_sentences) > 0)
+        & (np.bincount(sentence_of[present], minlength=n_sentences) > 0)))
+    content_counts = store.type_counts(store.content_mask)
+    repetitions = int(np.count_nonzero(content_counts > 3))
+    sensory_count = sum(get_matcher(sensory_words).count(store).values())
+    disruptions = get_pattern_matcher(disruption_markers).count(store)
+    total_words = int(content_counts.sum())
     return {
         "tense_shifts": tense_shifts,
-        "tense_shift_rate": tense_shifts / len(list(doc.sents)) if doc.sents else 0,
+        "tense_shift_rate": tense_shifts / n_sentences if n_sentences else 0,
         "repetition_count": repetitions,
         "repetition_rate": repetitions / total_words if total_words > 0 else 0,
         "sensory_count": sensory_count,
         "sensory_rate": sensory_count / total_words if total_words > 0 else 0,
-        "disruption_markers": ellipses + dashes,
-        "disruption_rate": (ellipses + dashes) / len(list(doc.sents)) if doc.sents else 0
+        "disruption_markers": disruptions,
+        "disruption_rate": disruptions / n_sentences if n_sentences else 0
+    }
+
+def _segments(texts):
+    return [texts] if isinstance(texts, str) else list(texts)
+
+def sentence_trends(texts, window=SENTENCE_WINDOW, stride=SENTENCE_STRIDE, disruption_markers=DISRUPTION_MARKERS):
+    """Rolling sentiment mean/std and disruption-marker rate over windows of sentences.
+
+    texts is one text or a sequence of segments (e.g. the two parts) read as one stream;
+    disruption markers are counted as in analyze_trauma_markers.
+    """
+    markers = get_pattern_matcher(disruption_markers)
+    tokenize = resources.get("sent_tokenize")
+    sentences = [sentence for text in _segments(texts) for sentence in tokenize(text)]
+    scores = sentiment_scorer.score(sentences)[:, 0] if sentences else np.zeros(0)
+    disruptions = np.array([markers.count(sentence) for sentence in sentences], dtype=np.float64)
+    sentiment_mean, sentiment_std = rolling_mean_std(scores, window, stride)
+    return {
+        "start": window_starts(len(sentences), window, stride),
+        "sentiment_mean": sentiment_mean,
+        "sentiment_std": sentiment_std,
+        "disruption_rate": rolling_rate(disruptions, window, stride)
+    }
+
+def token_trends(texts, legal_terms, window=TOKEN_WINDOW, stride=TOKEN_STRIDE):
+    """Rolling TTR (over content words) and legal-term density (over words) in token windows.
+
+    texts is one text or a sequence of segments; each segment reuses its own (cached) parse,
+    so trends over the parts already analyzed cost no extra spaCy pass.
+    """
+    segments = _segments(texts)
+    offsets = np.concatenate(([0], np.cumsum([len(text) for text in segments])))[:-1]
+    store = TokenStore.concat([token_store(text) for text in segments], offsets.tolist())
+    content_ids = store.ids[store.content_mask]
+    alpha = store.alpha_mask
+    # Each match counts at its first token, located among the alphabetic tokens
+    match_starts = np.array([start for _, start, _ in get_matcher(legal_terms).finditer(store)], dtype=np.int64)
+    word_index = np.cumsum(alpha) - 1
+    legal_hits = np.bincount(np.maximum(word_index[np.searchsorted(store.starts, match_starts)], 0),
+                             minlength=int(alpha.sum()))
+    return {
+        "ttr_start": window_starts(len(content_ids), window, stride),
+        "ttr": rolling_ttr(content_ids, window, stride),
+        "legal_start": window_starts(len(legal_hits), window, stride),
+        "legal_density": rolling_rate(legal_hits, window, stride)
     }
@@ -1,14 +1,28 @@
 import os
+import sys
+import glob
+import time
+import logging
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-import pandas as pd
 from prima_facie_analysis import preprocess_script
+from instrumentation import span, trace_run
 from linguistic_analysis import (
     calculate_lexical_diversity, analyze_legal_terminology,
     analyze_sentence_structure, analyze_emotion_expression,
-    analyze_trauma_markers
+    analyze_trauma_markers, clear_parses, configure_caches, configure_sentiment, init_worker, prepare_segment,
+    save_caches,
+    sentence_trends, token_trends
+)
+from comparative_analysis import (
+    build_analyzers, compare_parts, compare_segments, feature_matrix, visualize_comparison
 )
-from comparative_analysis import compare_parts, visualize_comparison
+from results_store import ResultsStore, new_run_id
+
+# Shared settings (LOG_PATH, LOG_LEVEL) live in code/config.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+from config import config
 
 legal_terms = [
     "evidence", "testimony", "witness", "cross-examination", "prosecution",
@@ -19,89 +33,259 @@ legal_terms = [
     "adversarial", "complainant", "counsel", "defendant", "jurisdiction"
 ]
 
-def run_analysis(file_path, output_dir):
-    print(f"Starting Prima Facie text analysis...")
-    start_time = datetime.now()
+analyzer_functions = (
+    calculate_lexical_diversity, analyze_legal_terminology,
+    analyze_sentence_structure, analyze_emotion_expression,
+    analyze_trauma_markers
+)
+
+report_names = {"part_one": "Part One", "part_two": "Part Two"}
+word_count_labels = {"part_one": "Part One (Lawyer)", "part_two": "Part Two (Victim)"}
+
+report_sections = [
+    ("2. Lexical Diversity", [
+        ("TTR", "lexical_diversity.ttr", ".4f"),
+        ("MATTR", "lexical_diversity.mattr", ".4f"),
+        ("MTLD", "lexical_diversity.mtld", ".2f")]),
+    ("3. Syntactic Structure", [
+        ("Avg Sentence Length", "sentence_structure.avg_length", ".2f"),
+        ("Complex Sentence Rate", "sentence_structure.complex_sentence_rate", ".2f"),
+        ("Fragment Rate", "sentence_structure.fragment_rate", ".2f")]),
+    ("4. Emotion", [
+        ("Avg Sentiment", "emotion.avg_sentiment", ".2f"),
+        ("Sentiment Variation", "emotion.sentiment_variation", ".2f")]),
+    ("5. Trauma Markers", [
+        ("Tense Shift Rate", "trauma_markers.tense_shift_rate", ".2f"),
+        ("Repetition Rate", "trauma_markers.repetition_rate", ".2f"),
+        ("Sensory Rate", "trauma_markers.sensory_rate", ".2f"),
+        ("Disruption Rate", "trauma_markers.disruption_rate", ".2f")]),
+]
+
+def scene_segments(text_data):
+    return {f"scene_{number:02d}": scene for number, scene in enumerate(text_data["scenes"], start=1)}
+
+def add_document_stats(matrix, text_data, segments=None):
+    # Word and scene counts travel with the features, so the report can be rendered from stored rows alone
+    segments = segments or text_data
+    matrix.loc["stats.words"] = [len(segments[segment].split()) for segment in matrix.columns]
+    matrix.loc["stats.scene_count"] = len(text_data["scenes"])
+    return matrix
+
+def document_name(file_path):
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def analyze_document(file_path, output_dir, scenes=False, pool_options=None, log=print, plots=True,
+                     store=None, run_id=None, document=None):
     os.makedirs(output_dir, exist_ok=True)
+    pool_options = pool_options or {}
     # Step 1: Preprocess
-    print("1. Preprocessing script...")
-    text_data = preprocess_script(file_path)
+    log("1. Preprocessing script...")
+    with span("preprocess_script"):
+        text_data = preprocess_script(file_path)
     # Step 2: Compare Part One and Part Two
-    print("2. Comparing text segments...")
-    comparison_results = compare_parts(
-        text_data, legal_terms,
-        calculate_lexical_diversity, analyze_legal_terminology,
-        analyze_sentence_structure, analyze_emotion_expression,
-        analyze_trauma_markers
-    )
-    # Step 3: Visualization
-    print("3. Visualizing results...")
-    visualize_comparison(comparison_results, output_dir, legal_terms)
-    # Step 4: Report
-    generate_report(comparison_results, text_data, output_dir)
+    log("2. Comparing text segments...")
+    with span("compare_parts", len(text_data["full_text"].split())):
+        comparison_results = compare_parts(text_data, legal_terms, *analyzer_functions, **pool_options)
+        matrix = add_document_stats(feature_matrix(comparison_results), text_data)
+    # Step 3: Visualization (figures render in parallel and are skipped when their data is unchanged)
+    plot_workers = pool_options.get("workers", 1)
+    if plots:
+        log("3. Visualizing results...")
+        # Trends run over Part One then Part Two, reusing the parts' parses from step 2
+        parts = [text_data["part_one"], text_data["part_two"]]
+        with span("trends", sum(len(part.split()) for part in parts)):
+            trends = (sentence_trends(parts), token_trends(parts, legal_terms))
+        with span("visualize_comparison"):
+            visualize_comparison(matrix, output_dir, legal_terms, plot_workers, trends=trends)
+    # Step 4: Store every metric, then render the report as a view of the stored rows
+    with span("generate_report"):
+        if store is not None:
+            document = document or document_name(file_path)
+            store.append(run_id, document, matrix, source=os.path.abspath(file_path))
+            generate_report(store.matrix(run_id, document), output_dir)
+        else:
+            generate_report(matrix, output_dir)
+    # Optional: scene-level comparison
+    if scenes and text_data["scenes"]:
+        log("4. Comparing scenes...")
+        with span("compare_scenes", len(text_data["scenes"])):
+            segments = scene_segments(text_data)
+            scene_results = compare_segments(
+                segments, build_analyzers(legal_terms, *analyzer_functions), **pool_options)
+            scene_matrix = add_document_stats(feature_matrix(scene_results), text_data, segments)
+            scene_matrix.to_csv(os.path.join(output_dir, "scene_features.csv"), index_label="feature")
+        if plots:
+            with span("visualize_scenes"):
+                visualize_comparison(scene_matrix, os.path.join(output_dir, "scenes"), legal_terms, plot_workers)
+    return text_data, matrix
+
+def run_analysis(file_path, output_dir, cache_dir=None, workers=1, scenes=False,
+                 log_dir=None, chrome_trace=False, trace_memory=False, plots=True, store_dir=None,
+                 sentiment_workers=1):
+    print(f"Starting Prima Facie text analysis...")
+    start_time = datetime.now()
+    os.makedirs(output_dir, exist_ok=True)
+    # Parsed documents are reused across reruns of an unchanged script
+    cache_dir = cache_dir or os.path.join(output_dir, "cache")
+    configure_caches(cache_dir)
+    configure_sentiment(sentiment_workers)
+    pool_options = dict(workers=workers, prepare=prepare_segment,
+                        initializer=init_worker, initargs=(cache_dir,))
+    # Metrics are appended to a Parquet store shared by all runs (partitioned by run id and document)
+    store = ResultsStore(store_dir or os.path.join(output_dir, "store"))
+    run_id = new_run_id()
+    # Per-stage wall/CPU time, memory and throughput go to <log_dir>/analysis-<timestamp>.json
+    with trace_run("analysis", log_dir, chrome_trace, trace_memory):
+        analyze_document(file_path, output_dir, scenes, pool_options, plots=plots, store=store, run_id=run_id)
+    save_caches()
     print(f"Analysis complete! Time used: {datetime.now() - start_time}")
+    print(f"Run {run_id} stored in {store.root}")
+    print(f"Results saved to {output_dir}")
+
+def find_corpus_files(source):
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "*.txt")))
+    return sorted(glob.glob(source, recursive=True))
+
+def document_names(file_paths):
+    names, seen = [], {}
+    for path in file_paths:
+        stem = document_name(path)
+        seen[stem] = seen.get(stem, 0) + 1
+        names.append(stem if seen[stem] == 1 else f"{stem}_{seen[stem]}")
+    return names
+
+def analyze_corpus_document(file_path, output_dir, plots=True, store=None, run_id=None, document=None):
+    with span("analyze_document"):
+        try:
+            text_data, matrix = analyze_document(file_path, output_dir, log=lambda message: None, plots=plots,
+                                                 store=store, run_id=run_id, document=document)
+        finally:
+            # Parses are never shared between documents, so memory stays flat across the corpus
+            clear_parses()
+    return matrix, len(text_data["full_text"].split())
+
+def run_corpus(source, output_dir, cache_dir=None, workers=1, log_dir=None, chrome_trace=False, trace_memory=False,
+               plots=True, store_dir=None, sentiment_workers=1):
+    file_paths = find_corpus_files(source)
+    if not file_paths:
+        print(f"No script files found for {source}")
+        return None
+    print(f"Starting corpus analysis of {len(file_paths)} documents...")
+    os.makedirs(output_dir, exist_ok=True)
+    cache_dir = cache_dir or os.path.join(output_dir, "cache")
+    configure_caches(cache_dir)
+    # Serial mode only: pool workers already run one document each
+    configure_sentiment(sentiment_workers if workers <= 1 else 1)
+    names = document_names(file_paths)
+    store = ResultsStore(store_dir or os.path.join(output_dir, "store"))
+    run_id = new_run_id()
+    jobs = [(name, path, os.path.join(output_dir, name)) for name, path in zip(names, file_paths)]
+    matrices = {}
+    total_tokens = 0
+    start = time.perf_counter()
+
+    def record(done, name, matrix, tokens):
+        nonlocal total_tokens
+        matrices[name] = matrix
+        total_tokens += tokens
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        print(f"[{done}/{len(jobs)}] {name}: {done/elapsed:.2f} docs/s, {total_tokens/elapsed:,.0f} tokens/s")
+
+    # Documents analyzed in pool workers show up as one "documents" span (workers are not traced)
+    with trace_run("corpus", log_dir, chrome_trace, trace_memory):
+        with span("documents", len(jobs)):
+            if workers <= 1:
+                for done, (name, path, doc_dir) in enumerate(jobs, start=1):
+                    record(done, name, *analyze_corpus_document(path, doc_dir, plots, store, run_id, name))
+            else:
+                # Workers stay warm: models load once per process and serve many documents
+                with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                         initargs=(cache_dir,)) as pool:
+                    futures = {pool.submit(analyze_corpus_document, path, doc_dir, plots, store, run_id, name): name
+                               for name, path, doc_dir in jobs}
+                    for done, future in enumerate(as_completed(futures), start=1):
+                        record(done, futures[future], *future.result())
+        with span("corpus_features"):
+            import pandas as pd
+            # One row per (document, segment), one column per feature
+            table = pd.concat({name: matrices[name].T for name in names}, names=["document", "segment"])
+            table.to_csv(os.path.join(output_dir, "corpus_features.csv"))
+    save_caches()
+    elapsed = time.perf_counter() - start
+    print(f"Corpus analysis complete! {len(jobs)} documents, {total_tokens:,} tokens in {elapsed:.1f}s")
+    print(f"Run {run_id} stored in {store.root}")
     print(f"Results saved to {output_dir}")
+    return table
 
-def generate_report(comparison_results, text_data, output_dir):
-    part_one_words = len(text_data["part_one"].split())
-    part_two_words = len(text_data["part_two"].split())
+def generate_report(matrix, output_dir):
+    """Renders analysis_report.txt and legal_terms_data.csv from a features x segments matrix
+    (from ResultsStore.matrix, or any feature_matrix such as the --scenes one; stats.* rows are optional)."""
+    import pandas as pd
+    segments = list(matrix.columns)
+    names = [report_names.get(segment, segment) for segment in segments]
+    # Any segments can drive the report (parts, scenes, documents); rows a matrix lacks are skipped
+    def value(feature, segment):
+        if feature not in matrix.index:
+            return None
+        item = matrix.at[feature, segment]
+        return None if pd.isna(item) else item
+    report_terms = [term for term in legal_terms if f"legal_terms.{term}.frequency" in matrix.index]
     with open(os.path.join(output_dir, "analysis_report.txt"), "w") as f:
         f.write("Prima Facie Text Analysis Report\n")
         f.write("="*40 + "\n\n")
         f.write("1. Basic Stats\n")
-        f.write(f"Part One (Lawyer) words: {part_one_words}\n")
-        f.write(f"Part Two (Victim) words: {part_two_words}\n")
-        f.write(f"Scene count: {len(text_data['scenes'])}\n\n")
-        f.write("2. Lexical Diversity\n")
-        f.write(f"Part One TTR: {comparison_results['part_one']['lexical_diversity']['ttr']:.4f}\n")
-        f.write(f"Part Two TTR: {comparison_results['part_two']['lexical_diversity']['ttr']:.4f}\n\n")
-        f.write("3. Syntactic Structure\n")
-        f.write(f"Part One Avg Sentence Length: {comparison_results['part_one']['sentence_structure']['avg_length']:.2f}\n")
-        f.write(f"Part Two Avg Sentence Length: {comparison_results['part_two']['sentence_structure']['avg_length']:.2f}\n")
-        f.write(f"Part One Complex Sentence Rate: {comparison_results['part_one']['sentence_structure']['complex_sentence_rate']:.2f}\n")
-        f.write(f"Part Two Complex Sentence Rate: {comparison_results['part_two']['sentence_structure']['complex_sentence_rate']:.2f}\n")
-        f.write(f"Part One Fragment Rate: {comparison_results['part_one']['sentence_structure']['fragment_rate']:.2f}\n")
-        f.write(f"Part Two Fragment Rate: {comparison_results['part_two']['sentence_structure']['fragment_rate']:.2f}\n\n")
-        f.write("4. Emotion\n")
-        f.write(f"Part One Avg Sentiment: {comparison_results['part_one']['emotion']['avg_sentiment']:.2f}\n")
-        f.write(f"Part Two Avg Sentiment: {comparison_results['part_two']['emotion']['avg_sentiment']:.2f}\n")
-        f.write(f"Part One Sentiment Variation: {comparison_results['part_one']['emotion']['sentiment_variation']:.2f}\n")
-        f.write(f"Part Two Sentiment Variation: {comparison_results['part_two']['emotion']['sentiment_variation']:.2f}\n\n")
-        f.write("5. Trauma Markers\n")
-        f.write(f"Part One Tense Shift Rate: {comparison_results['part_one']['trauma_markers']['tense_shift_rate']:.2f}\n")
-        f.write(f"Part Two Tense Shift Rate: {comparison_results['part_two']['trauma_markers']['tense_shift_rate']:.2f}\n")
-        f.write(f"Part One Repetition Rate: {comparison_results['part_one']['trauma_markers']['repetition_rate']:.2f}\n")
-        f.write(f"Part Two Repetition Rate: {comparison_results['part_two']['trauma_markers']['repetition_rate']:.2f}\n")
-        f.write(f"Part One Sensory Rate: {comparison_results['part_one']['trauma_markers']['sensory_rate']:.2f}\n")
-        f.write(f"Part Two Sensory Rate: {comparison_results['part_two']['trauma_markers']['sensory_rate']:.2f}\n")
-        f.write(f"Part One Disruption Rate: {comparison_results['part_one']['trauma_markers']['disruption_rate']:.2f}\n")
-        f.write(f"Part Two Disruption Rate: {comparison_results['part_two']['trauma_markers']['disruption_rate']:.2f}\n\n")
+        for segment, name in zip(segments, names):
+            words = value("stats.words", segment)
+            if words is not None:
+                f.write(f"{word_count_labels.get(segment, name)} words: {int(words)}\n")
+        scene_counts = [count for count in (value("stats.scene_count", segment) for segment in segments)
+                        if count is not None]
+        if scene_counts:
+            f.write(f"Scene count: {int(scene_counts[0])}\n")
+        f.write("\n")
+        for title, metrics in report_sections:
+            f.write(f"{title}\n")
+            for label, feature, fmt in metrics:
+                for segment, name in zip(segments, names):
+                    item = value(feature, segment)
+                    if item is not None:
+                        f.write(f"{name} {label}: {item:{fmt}}\n")
+            f.write("\n")
         f.write("6. Top 5 Legal Terms (per 1000 words)\n")
-        p1_terms = sorted(
-            [(term, comparison_results["part_one"]["legal_terms"][term]["frequency"]*1000)
-             for term in legal_terms], key=lambda x: x[1], reverse=True)[:5]
-        p2_terms = sorted(
-            [(term, comparison_results["part_two"]["legal_terms"][term]["frequency"]*1000)
-             for term in legal_terms], key=lambda x: x[1], reverse=True)[:5]
-        f.write("Part One:\n")
-        for term, freq in p1_terms:
-            f.write(f"  - {term}: {freq:.2f}\n")
-        f.write("Part Two:\n")
-        for term, freq in p2_terms:
-            f.write(f"  - {term}: {freq:.2f}\n")
+        for segment, name in zip(segments, names):
+            per_thousand = [(term, (value(f"legal_terms.{term}.frequency", segment) or 0)*1000) for term in report_terms]
+            f.write(f"{name}:\n")
+            for term, freq in sorted(per_thousand, key=lambda x: x[1], reverse=True)[:5]:
+                f.write(f"  - {term}: {freq:.2f}\n")
     # Also save detailed term data for further research
-    p1_legal = {term: comparison_results["part_one"]["legal_terms"][term]["frequency"]*1000 for term in legal_terms}
-    p2_legal = {term: comparison_results["part_two"]["legal_terms"][term]["frequency"]*1000 for term in legal_terms}
-    legal_df = pd.DataFrame({
-        "Term": legal_terms,
-        "Part_One": [p1_legal[term] for term in legal_terms],
-        "Part_Two": [p2_legal[term] for term in legal_terms]
-    })
+    legal_df = pd.DataFrame({"Term": report_terms})
+    for segment, name in zip(segments, names):
+        legal_df[name.replace(" ", "_")] = [(value(f"legal_terms.{term}.frequency", segment) or 0)*1000
+                                            for term in report_terms]
     legal_df.to_csv(os.path.join(output_dir, "legal_terms_data.csv"), index=False)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Analyze Prima Facie text for untranslatability research')
-    parser.add_argument('file_path', help='Path to the Prima Facie script text file')
+    parser.add_argument('file_path', nargs='?', help='Path to the Prima Facie script text file')
+    parser.add_argument('--corpus', default=None, help='Directory (*.txt) or glob of scripts to analyze as a corpus')
     parser.add_argument('--output', default='results', help='Output directory for results')
+    parser.add_argument('--cache-dir', default=None, help='Directory for cached spaCy parses and sentiment scores (default: <output>/cache)')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes for analyzer jobs, or for documents with --corpus (1 = serial)')
+    parser.add_argument('--scenes', action='store_true', help='Also compare every scene and save scene_features.csv')
+    parser.add_argument('--log-dir', default=config.LOG_PATH, help='Directory for per-stage JSON traces (empty string disables tracing)')
+    parser.add_argument('--chrome-trace', action='store_true', help='Also write a Chrome trace-event file (chrome://tracing, Perfetto)')
+    parser.add_argument('--trace-memory', action='store_true', help='Also record tracemalloc peak memory per stage (slows the run down several times)')
+    parser.add_argument('--no-plots', action='store_true', help='Skip figure rendering (batch runs)')
+    parser.add_argument('--store', default=None, help='Parquet results store shared across runs (default: <output>/store)')
+    parser.add_argument('--sentiment-workers', type=int, default=1, help='Processes for large sentiment batches scored in the main process (1 = serial)')
     args = parser.parse_args()
-    run_analysis(args.file_path, args.output)
+    logging.basicConfig(level=config.LOG_LEVEL, format="%(levelname)s %(name)s: %(message)s")
+    trace_options = dict(log_dir=args.log_dir, chrome_trace=args.chrome_trace, trace_memory=args.trace_memory,
+                         plots=not args.no_plots, store_dir=args.store, sentiment_workers=args.sentiment_workers)
+    if args.corpus:
+        run_corpus(args.corpus, args.output, args.cache_dir, args.workers, **trace_options)
+    elif args.file_path:
+        run_analysis(args.file_path, args.output, args.cache_dir, args.workers, args.scenes, **trace_options)
+    else:
+        parser.error('either file_path or --corpus is required')
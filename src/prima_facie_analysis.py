@@ -4,6 +4,10 @@ def preprocess_script(file_path):
     """Reads Prima Facie script and segments PART ONE and PART TWO, extracts scenes."""
     with open(file_path, 'r', encoding='utf-8') as file:
         text = file.read()
+    return segment_script(text)
+
+def segment_script(text):
+    """Segments script text into PART ONE and PART TWO and extracts scenes."""
     # Segment PART ONE and PART TWO
     part_one_pattern = r'PART ONE.*?(?=PART TWO|$)'
     part_two_pattern = r'PART TWO.*'
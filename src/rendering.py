@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+MANIFEST_NAME = ".figures.json"
+
+def use_agg():
+    # Figures are only ever written to files, so never start a GUI backend (also safe in worker processes)
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot hash figure data of type {type(value).__name__}")
+
+class Figure:
+    """One output file: a module-level render function plus the plain data it draws.
+
+    The key hashes the render function's source together with its arguments, so a
+    figure is re-rendered only when its numbers, labels or drawing code change.
+    """
+
+    def __init__(self, path, render, **data):
+        self.path = path
+        self.render = render
+        self.data = data
+
+    @property
+    def key(self):
+        payload = json.dumps({"render": inspect.getsource(self.render), "data": self.data},
+                             sort_keys=True, default=_jsonable)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _render(figure):
+    use_agg()
+    os.makedirs(os.path.dirname(os.path.abspath(figure.path)), exist_ok=True)
+    figure.render(figure.path, **figure.data)
+    return figure.path
+
+def _load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def render_figures(figures, workers=1, force=False):
+    """Renders figures whose key changed since the last run; returns {path: "rendered" | "cached"}.
+
+    Keys of rendered figures are kept in a .figures.json manifest next to the images.
+    With workers > 1, pending figures are drawn in parallel worker processes.
+    """
+    manifests = {}
+    status, pending = {}, []
+    for figure in figures:
+        directory, name = os.path.split(os.path.abspath(figure.path))
+        manifest = manifests.setdefault(directory, _load_manifest(directory))
+        key = figure.key
+        if not force and manifest.get(name) == key and os.path.exists(figure.path):
+            status[figure.path] = "cached"
+        else:
+            pending.append((figure, directory, name, key))
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=use_agg) as pool:
+            list(pool.map(_render, [figure for figure, *_ in pending]))
+    else:
+        for figure, *_ in pending:
+            _render(figure)
+    for figure, directory, name, key in pending:
+        manifests[directory][name] = key
+        status[figure.path] = "rendered"
+    for directory in {directory for _, directory, _, _ in pending}:
+        _save_manifest(directory, manifests[directory])
+    return status
+
+# Render functions: module-level so worker processes can unpickle them, plain data in, one file out
+
+def bar_chart(path, labels, values, title, ylabel=None, xlabel=None, figsize=(8, 5), rotation=0):
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=figsize)
+    plt.bar(labels, values)
+    plt.title(title)
+    if xlabel:
+        plt.xlabel(xlabel)
+    if ylabel:
+        plt.ylabel(ylabel)
+    if rotation:
+        plt.xticks(rotation=rotation)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def grouped_bar_chart(path, tick_labels, series, title, xlabel, ylabel, figsize=(8, 5), rotation=0):
+    """series: list of (label, values) pairs, one bar per tick label in each."""
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=figsize)
+    x = np.arange(len(tick_labels))
+    width = 0.7 / len(series)
+    offsets = (np.arange(len(series)) - (len(series) - 1) / 2) * width
+    for offset, (label, values) in zip(offsets, series):
+        plt.bar(x + offset, values, width, label=label)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.title(title)
+    if rotation:
+        plt.xticks(x, tick_labels, rotation=rotation, ha="right")
+    else:
+        plt.xticks(x, tick_labels)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def trend_chart(path, panels, title, figsize=(12, 8)):
+    """panels: list of (ylabel, xlabel, x, values, spread) stacked vertically; spread (or None) is drawn as a band."""
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(len(panels), 1, figsize=figsize, squeeze=False)
+    for ax, (ylabel, xlabel, x, values, spread) in zip(axes[:, 0], panels):
+        x, values = np.asarray(x), np.asarray(values)
+        ax.plot(x, values)
+        if spread is not None:
+            ax.fill_between(x, values - np.asarray(spread), values + np.asarray(spread), alpha=0.25)
+        ax.set_ylabel(ylabel)
+        ax.set_xlabel(xlabel)
+    fig.suptitle(title)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+def word_cloud(path, frequencies, width=800, height=400):
+    from wordcloud import WordCloud
+    wc = WordCloud(width=width, height=height, background_color='white').generate_from_frequencies(dict(frequencies))
+    wc.to_file(path)
@@ -0,0 +1,94 @@
+import time
+
+SPACY_MODEL = "en_core_web_sm"
+
+# NLTK data each resource needs; the first path found locally wins (punkt_tab replaces punkt in NLTK >= 3.8.2)
+NLTK_DATA = {
+    "punkt": ("tokenizers/punkt_tab/english/", "tokenizers/punkt/english.pickle"),
+    "stopwords": ("corpora/stopwords",),
+    "vader_lexicon": ("sentiment/vader_lexicon.zip",),
+    "wordnet": ("corpora/wordnet",),
+    "averaged_perceptron_tagger": ("taggers/averaged_perceptron_tagger_eng/", "taggers/averaged_perceptron_tagger/"),
+}
+
+_loaders = {}
+_instances = {}
+
+def nltk_available(name):
+    """Checks the local NLTK data path only; never touches the network."""
+    import nltk
+    for path in NLTK_DATA[name]:
+        try:
+            nltk.data.find(path)
+            return True
+        except LookupError:
+            continue
+    return False
+
+def require_nltk(*names):
+    missing = [name for name in names if not nltk_available(name)]
+    if missing:
+        raise LookupError(
+            f"Missing NLTK data: {', '.join(missing)}. "
+            f"Install it once with: python -m nltk.downloader {' '.join(missing)}"
+        )
+
+def register(name, loader):
+    _loaders[name] = loader
+
+def get(name):
+    """Returns the named resource, loading it on first use."""
+    if name not in _instances:
+        _instances[name] = _loaders[name]()
+    return _instances[name]
+
+def is_loaded(name):
+    return name in _instances
+
+def warm_up(*names):
+    """Loads the given resources (all registered ones by default); returns load seconds per resource."""
+    timings = {}
+    for name in names or list(_loaders):
+        start = time.perf_counter()
+        get(name)
+        timings[name] = time.perf_counter() - start
+    return timings
+
+def _load_spacy():
+    import spacy
+    if not spacy.util.is_package(SPACY_MODEL):
+        raise OSError(f"spaCy model '{SPACY_MODEL}' is not installed. "
+                      f"Install it once with: python -m spacy download {SPACY_MODEL}")
+    return spacy.load(SPACY_MODEL)
+
+def _load_vader():
+    require_nltk("vader_lexicon")
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+def _load_stopwords():
+    require_nltk("stopwords")
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+def _load_sent_tokenize():
+    require_nltk("punkt")
+    from nltk.tokenize import sent_tokenize
+    return sent_tokenize
+
+def _load_word_tokenize():
+    require_nltk("punkt")
+    from nltk.tokenize import word_tokenize
+    return word_tokenize
+
+def _load_lemmatizer():
+    require_nltk("wordnet")
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer()
+
+register("spacy", _load_spacy)
+register("vader", _load_vader)
+register("stopwords", _load_stopwords)
+register("sent_tokenize", _load_sent_tokenize)
+register("word_tokenize", _load_word_tokenize)
+register("lemmatizer", _load_lemmatizer)
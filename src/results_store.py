@@ -0,0 +1,161 @@
+import os
+import sys
+import uuid
+import argparse
+from datetime import datetime
+from urllib.parse import quote
+
+AGGREGATES = ("mean", "stddev", "min", "max", "count")
+
+def new_run_id():
+    return f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("segment", pa.dictionary(pa.int32(), pa.string())),
+        ("feature", pa.dictionary(pa.int32(), pa.string())),
+        ("value", pa.float64()),
+        ("source", pa.dictionary(pa.int32(), pa.string())),
+        ("created", pa.timestamp("s"))
+    ])
+
+class ResultsStore:
+    """Append-only Parquet store of feature values, one row per (run, document, segment, feature).
+
+    Files are hive-partitioned as <root>/run_id=<id>/document=<name>/part-<n>.parquet, so
+    new runs never rewrite old ones and filters on run_id / document only open matching files.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _partition(self, run_id, document):
+        return os.path.join(self.root, f"run_id={quote(run_id, safe='')}", f"document={quote(document, safe='')}")
+
+    def append(self, run_id, document, matrix, source=""):
+        """Writes a features x segments matrix as long-format rows; returns the file path."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        long = matrix.stack().rename_axis(["feature", "segment"]).reset_index(name="value")
+        created = datetime.now().replace(microsecond=0)
+        table = pa.table({
+            "segment": pa.array(long["segment"].astype(str)).dictionary_encode(),
+            "feature": pa.array(long["feature"].astype(str)).dictionary_encode(),
+            "value": pa.array(long["value"].astype(float)),
+            "source": pa.array([source] * len(long)).dictionary_encode(),
+            "created": pa.array([created] * len(long), pa.timestamp("s"))
+        }).cast(_schema())
+        directory = self._partition(run_id, document)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{len(os.listdir(directory))}.parquet")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    def dataset(self):
+        import pyarrow.dataset as ds
+        return ds.dataset(self.root, format="parquet", partitioning="hive", exclude_invalid_files=True,
+                          schema=_schema().append(_partition_field("run_id")).append(_partition_field("document")))
+
+    def table(self, run_ids=None, documents=None, features=None, segments=None):
+        """Reads matching rows as an Arrow table; each filter is a list of allowed values."""
+        import pyarrow.dataset as ds
+        if not os.path.isdir(self.root):
+            return _schema().empty_table()
+        condition = None
+        for column, values in (("run_id", run_ids), ("document", documents),
+                               ("feature", features), ("segment", segments)):
+            if values is not None:
+                expression = ds.field(column).isin(list(values))
+                condition = expression if condition is None else condition & expression
+        return self.dataset().to_table(filter=condition)
+
+    def read(self, **filters):
+        return self.table(**filters).to_pandas()
+
+    def runs(self):
+        """One row per run: documents, rows and creation time, oldest first."""
+        table = self.table()
+        if table.num_rows == 0:
+            import pandas as pd
+            return pd.DataFrame(columns=["run_id", "documents", "rows", "created"])
+        summary = table.group_by("run_id").aggregate([
+            ("document", "count_distinct"), ("value", "count"), ("created", "min")
+        ]).to_pandas().rename(columns={"document_count_distinct": "documents", "value_count": "rows",
+                                       "created_min": "created"})
+        return summary[["run_id", "documents", "rows", "created"]].sort_values("created", kind="stable").reset_index(drop=True)
+
+    def latest_run(self):
+        runs = self.runs()
+        return runs["run_id"].iloc[-1] if len(runs) else None
+
+    def matrix(self, run_id, document):
+        """Rebuilds the features x segments matrix of one document, in the order it was written."""
+        import pandas as pd
+        rows = self.read(run_ids=[run_id], documents=[document])
+        if rows.empty:
+            raise KeyError(f"No results for document {document!r} in run {run_id!r}")
+        for column in ("feature", "segment"):
+            rows[column] = rows[column].astype(str)
+        matrix = rows.pivot(index="feature", columns="segment", values="value")
+        matrix = matrix.reindex(index=pd.unique(rows["feature"]), columns=pd.unique(rows["segment"]))
+        matrix.index.name = matrix.columns.name = None
+        return matrix
+
+    def aggregate(self, by=("document", "segment", "feature"), aggregates=AGGREGATES, **filters):
+        """Aggregates values across runs (grouped by any of run_id, document, segment, feature)."""
+        table = self.table(**filters)
+        # Dictionary-encoded keys are decoded so grouping works across files with different dictionaries
+        for name in by:
+            index = table.schema.get_field_index(name)
+            if index >= 0 and str(table.schema.field(index).type).startswith("dictionary"):
+                table = table.set_column(index, name, table.column(name).cast("string"))
+        result = table.group_by(list(by)).aggregate([("value", name) for name in aggregates]).to_pandas()
+        result.columns = [column[len("value_"):] if column.startswith("value_") else column for column in result.columns]
+        return result.sort_values(list(by), kind="stable").reset_index(drop=True)
+
+def _partition_field(name):
+    import pyarrow as pa
+    return pa.field(name, pa.string())
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the Parquet results store written by main.py")
+    parser.add_argument("store", help="Store directory (default location: <output>/store)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("runs", help="List stored runs")
+    report = commands.add_parser("report", help="Render the text report of one stored run")
+    report.add_argument("--run-id", help="Run to render (default: latest)")
+    report.add_argument("--document", help="Document to render (default: the run's only/first document)")
+    report.add_argument("--output", default=".", help="Directory for analysis_report.txt")
+    aggregate = commands.add_parser("aggregate", help="Aggregate feature values across runs")
+    aggregate.add_argument("--feature", nargs="+", help="Only these features")
+    aggregate.add_argument("--document", nargs="+", help="Only these documents")
+    aggregate.add_argument("--run-id", nargs="+", help="Only these runs")
+    aggregate.add_argument("--by", nargs="+", default=["document", "segment", "feature"],
+                           help="Grouping columns (run_id, document, segment, feature)")
+    aggregate.add_argument("--csv", help="Also save the aggregate to this CSV file")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.store)
+    if args.command == "runs":
+        print(store.runs().to_string(index=False))
+    elif args.command == "report":
+        from main import generate_report
+        run_id = args.run_id or store.latest_run()
+        if run_id is None:
+            parser.error(f"no runs in {args.store}")
+        document = args.document or sorted(store.read(run_ids=[run_id])["document"].unique())[0]
+        os.makedirs(args.output, exist_ok=True)
+        generate_report(store.matrix(run_id, document), args.output)
+        print(f"Report for {document} ({run_id}) saved to {args.output}")
+    else:
+        result = store.aggregate(args.by, features=args.feature, documents=args.document, run_ids=args.run_id)
+        print(result.to_string(index=False))
+        if args.csv:
+            result.to_csv(args.csv, index=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import resources
+
+SCORE_FIELDS = ("compound", "pos", "neg", "neu")
+
+def _score_chunk(sentences):
+    # Runs in a batch worker process; VADER loads once per worker through the resource registry
+    return _score_with(resources.get("vader"), sentences)
+
+def _score_with(analyzer, sentences):
+    rows = np.empty((len(sentences), len(SCORE_FIELDS)))
+    for i, sentence in enumerate(sentences):
+        scores = analyzer.polarity_scores(sentence)
+        rows[i] = [scores[field] for field in SCORE_FIELDS]
+    return rows
+
+@contextmanager
+def _file_lock(path, timeout=10.0):
+    # Lock file created with O_EXCL (portable); a lock still held after timeout is taken over as stale
+    lock_path = f"{path}.lock"
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() > deadline:
+                fd = None
+                break
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        if fd is not None:
+            os.close(fd)
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+class SentimentScorer:
+    """Batch VADER scoring with de-duplication and a bounded LRU cache.
+
+    score() returns an (n, 4) float array with columns SCORE_FIELDS. Identical
+    sentences are scored once per batch, and scores are kept in an LRU of at most
+    max_size sentences that can be saved to / loaded from a JSON file between runs.
+    analyzer may be a zero-argument callable, which is only called once a sentence
+    actually needs scoring. With workers > 1, batches with at least parallel_threshold
+    unseen sentences are split across a pool of worker processes (started on first use).
+    """
+
+    def __init__(self, analyzer, max_size=100_000, cache_path=None, workers=1, parallel_threshold=5_000):
+        self._analyzer = analyzer
+        self.max_size = max_size
+        self.workers = workers
+        self.parallel_threshold = parallel_threshold
+        self._pool = None
+        self.cache_path = None
+        self._cache = OrderedDict()
+        self._dirty = False
+        if cache_path:
+            self.load(cache_path)
+
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def analyzer(self):
+        if not hasattr(self._analyzer, "polarity_scores"):
+            self._analyzer = self._analyzer()
+        return self._analyzer
+
+    def _compute(self, sentences):
+        if self.workers <= 1 or len(sentences) < self.parallel_threshold:
+            return _score_with(self.analyzer, sentences)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        chunk_size = -(-len(sentences) // self.workers)
+        chunks = [sentences[i:i + chunk_size] for i in range(0, len(sentences), chunk_size)]
+        return np.vstack(list(self._pool.map(_score_chunk, chunks)))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def score(self, sentences):
+        batch = {}
+        missing = []
+        for sentence in dict.fromkeys(sentences):
+            cached = self._cache.get(sentence)
+            if cached is None:
+                missing.append(sentence)
+            else:
+                self._cache.move_to_end(sentence)
+                batch[sentence] = cached
+        if missing:
+            for sentence, row in zip(missing, self._compute(missing)):
+                batch[sentence] = self._cache[sentence] = tuple(row.tolist())
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+            self._dirty = True
+        if not sentences:
+            return np.empty((0, len(SCORE_FIELDS)))
+        return np.array([batch[sentence] for sentence in sentences])
+
+    def clear(self):
+        self._cache.clear()
+        self._dirty = False
+
+    def _read(self, cache_path):
+        if not os.path.exists(cache_path):
+            return {}
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def load(self, cache_path):
+        self.cache_path = cache_path
+        for sentence, row in list(self._read(cache_path).items())[-self.max_size:]:
+            self._cache[sentence] = tuple(row)
+
+    def save(self, cache_path=None):
+        cache_path = cache_path or self.cache_path
+        if not cache_path or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        # Keep scores other processes saved since this one loaded (pool workers save as they exit)
+        with _file_lock(cache_path):
+            entries = OrderedDict((sentence, row) for sentence, row in self._read(cache_path).items()
+                                  if sentence not in self._cache)
+            entries.update(self._cache)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(dict(list(entries.items())[-self.max_size:]), f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        self._dirty = False
@@ -0,0 +1,322 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+import numpy as np
+import resources
+from linguistic_analysis import init_worker, prepare_segment, save_caches, score_sentences
+from sentiment_scorer import SCORE_FIELDS
+from comparative_analysis import build_analyzers, feature_matrix
+from prima_facie_analysis import segment_script
+from main import analyzer_functions, legal_terms as default_legal_terms, config
+
+logger = logging.getLogger("prima_facie.service")
+
+DEFAULT_PORT = 8765
+MAX_BODY = 64 * 1024 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _require(payload, key, kind):
+    value = payload.get(key)
+    if not isinstance(value, kind):
+        raise RequestError(400, f"'{key}' must be a {kind.__name__}")
+    return value
+
+class SentimentBatcher:
+    """Merges sentiment requests that arrive within delay seconds into one scoring job.
+
+    Each batch is de-duplicated by the scorer and sent to the pool as a single task, so many
+    small concurrent requests cost one round trip instead of one each.
+    """
+
+    def __init__(self, submit, delay=0.005, max_batch=4096):
+        self.submit = submit
+        self.delay = delay
+        self.max_batch = max_batch
+        self._pending = []
+        self._size = 0
+        self._timer = None
+        self._running = set()  # the event loop keeps only weak references to tasks
+
+    async def score(self, sentences):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((sentences, future))
+        self._size += len(sentences)
+        if self._size >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._size = self._pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        sentences = [sentence for request, _ in batch for sentence in request]
+        try:
+            rows = await self.submit(score_sentences, sentences)
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        start = 0
+        for request, future in batch:
+            future.set_result(rows[start:start + len(request)])
+            start += len(request)
+
+class AnalysisService:
+    """Keeps models warm in a bounded process pool and serves analyzers, compare_parts and sentiment.
+
+    At most max_pending jobs are queued on the pool; further requests wait for a slot.
+    With workers=0 jobs run on one thread of this process (models load once, here).
+    Each worker keeps at most max_docs parses in memory, and the shared parse cache holds
+    at most max_cache_files DocBin files, so memory and disk stay bounded however long it runs.
+    """
+
+    def __init__(self, workers=2, cache_dir=None, max_pending=None, batch_delay=0.005, max_batch=4096,
+                 max_docs=16, max_cache_files=256):
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.cache_options = (cache_dir, max_docs, max_cache_files)
+        self.started = time.time()
+        self.requests = 0
+        self._pool = None
+        self._slots = asyncio.Semaphore(max_pending or max(workers, 1) * 4)
+        self.sentiment = SentimentBatcher(self.submit, batch_delay, max_batch)
+
+    async def start(self):
+        if self.workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                             initargs=self.cache_options)
+            # One trivial job per worker starts the processes; init_worker loads every model before it runs
+            await asyncio.gather(*(self.submit(resources.is_loaded, "spacy") for _ in range(self.workers)))
+        else:
+            # The analyzers' in-memory caches are not thread-safe, so a single thread serves every job
+            self._pool = ThreadPoolExecutor(max_workers=1)
+            await self.submit(init_worker, *self.cache_options)
+
+    def close(self):
+        if self._pool is not None:
+            # Pool workers save their sentiment scores as they exit; with workers=0 they live in this process
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+            if self.workers <= 0:
+                save_caches()
+
+    async def submit(self, func, *args):
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, partial(func, *args))
+
+    def analyzers(self, terms=None):
+        # An explicit empty list means "no legal terms", not the default lexicon
+        return build_analyzers(default_legal_terms if terms is None else terms, *analyzer_functions)
+
+    async def analyze(self, name, text, terms=None):
+        analyzers = self.analyzers(terms)
+        if name not in analyzers:
+            raise RequestError(404, f"Unknown analyzer '{name}' (available: {', '.join(analyzers)})")
+        return await self.submit(analyzers[name], text)
+
+    async def compare(self, segments, terms=None):
+        """Runs every analyzer on every segment concurrently; segments are parsed once up front."""
+        analyzers = self.analyzers(terms)
+        await asyncio.gather(*(self.submit(prepare_segment, text) for text in segments.values()))
+        jobs = {(name, key): self.submit(analyze, text)
+                for name, text in segments.items() for key, analyze in analyzers.items()}
+        results = dict(zip(jobs, await asyncio.gather(*jobs.values())))
+        return {name: {key: results[(name, key)] for key in analyzers} for name in segments}
+
+    async def handle(self, method, path, payload):
+        self.requests += 1
+        if path == "/health":
+            return {"status": "ok", "workers": self.workers, "uptime_s": time.time() - self.started,
+                    "requests": self.requests, "analyzers": list(self.analyzers())}
+        if method != "POST":
+            raise RequestError(405 if path.startswith(("/analyze", "/compare_parts", "/sentiment")) else 404,
+                               f"{method} {path} is not supported")
+        terms = payload.get("legal_terms")
+        if terms is not None and not (isinstance(terms, list) and all(isinstance(term, str) for term in terms)):
+            raise RequestError(400, "'legal_terms' must be a list of strings")
+        if path == "/sentiment":
+            sentences = _require(payload, "sentences", list)
+            rows = await self.sentiment.score([str(sentence) for sentence in sentences])
+            return {"fields": list(SCORE_FIELDS), "scores": rows}
+        if path == "/analyze":
+            return (await self.compare({"text": _require(payload, "text", str)}, terms))["text"]
+        if path.startswith("/analyze/"):
+            return await self.analyze(path[len("/analyze/"):], _require(payload, "text", str), terms)
+        if path == "/compare_parts":
+            if "text" in payload:
+                text_data = segment_script(_require(payload, "text", str))
+            else:
+                text_data = {"part_one": _require(payload, "part_one", str),
+                             "part_two": _require(payload, "part_two", str)}
+            results = await self.compare({"part_one": text_data["part_one"], "part_two": text_data["part_two"]}, terms)
+            if payload.get("features"):
+                return {"results": results, "features": feature_matrix(results).to_dict()}
+            return {"results": results}
+        raise RequestError(404, f"Unknown endpoint {path}")
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise RequestError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise RequestError(400, "Content-Length must be an integer")
+    if length < 0:
+        raise RequestError(400, "Content-Length must not be negative")
+    if length > MAX_BODY:
+        raise RequestError(413, f"Request body larger than {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), urlsplit(target).path.rstrip("/") or "/", headers, body
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, default=_json_default).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+async def _serve_connection(service, reader, writer):
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    payload = json.loads(body) if body else {}
+                except ValueError:
+                    raise RequestError(400, "Body must be JSON")
+                if not isinstance(payload, dict):
+                    raise RequestError(400, "Body must be a JSON object")
+                start = time.perf_counter()
+                status, result = 200, await service.handle(method, path, payload)
+                logger.info("%s %s %.1f ms", method, path, (time.perf_counter() - start) * 1000)
+            except RequestError as exc:
+                status, result = exc.status, {"error": str(exc)}
+            except Exception as exc:  # reported to the client; the service keeps running
+                logger.exception("Request failed")
+                status, result = 500, {"error": f"{type(exc).__name__}: {exc}"}
+            writer.write(_response(status, result, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host="127.0.0.1", port=DEFAULT_PORT, socket_path=None, **service_options):
+    service = AnalysisService(**service_options)
+    start = time.perf_counter()
+    await service.start()
+    handler = partial(_serve_connection, service)
+    if socket_path:
+        server = await asyncio.start_unix_server(handler, path=socket_path)
+        address = f"unix:{socket_path}"
+    else:
+        server = await asyncio.start_server(handler, host, port)
+        address = f"http://{host}:{port}"
+    print(f"Models warm in {time.perf_counter() - start:.1f}s; serving on {address}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+class ServiceClient:
+    """Minimal JSON client for notebooks and batch scripts (standard library only)."""
+
+    def __init__(self, url=f"http://127.0.0.1:{DEFAULT_PORT}", timeout=300):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, path, payload=None):
+        from urllib.request import Request, urlopen
+        from urllib.error import HTTPError
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        request = Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except HTTPError as exc:
+            raise RuntimeError(json.loads(exc.read()).get("error", str(exc))) from None
+
+    def health(self):
+        return self.request("/health")
+
+    def analyze(self, text, analyzer=None, legal_terms=None):
+        path = f"/analyze/{analyzer}" if analyzer else "/analyze"
+        return self.request(path, {"text": text, "legal_terms": legal_terms})
+
+    def compare_parts(self, text=None, part_one=None, part_two=None, legal_terms=None, features=False):
+        payload = {"text": text} if text is not None else {"part_one": part_one, "part_two": part_two}
+        return self.request("/compare_parts", {**payload, "legal_terms": legal_terms, "features": features})
+
+    def sentiment(self, sentences):
+        result = self.request("/sentiment", {"sentences": list(sentences)})
+        return np.array(result["scores"]).reshape(-1, len(result["fields"]))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the text analyzers over HTTP with warm models")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port")
+    parser.add_argument("--socket", default=None, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=max(1, min(4, (os.cpu_count() or 2) - 1)),
+                        help="Worker processes with warm models (0 = run in this process)")
+    parser.add_argument("--max-pending", type=int, default=None, help="Jobs queued on the pool at once (default: 4 per worker)")
+    parser.add_argument("--cache-dir", default=os.path.join("results", "cache"), help="Parse and sentiment cache shared with main.py")
+    parser.add_argument("--batch-delay", type=float, default=0.005, help="Seconds to collect sentiment requests into one batch")
+    parser.add_argument("--max-docs", type=int, default=16, help="Parses kept in memory per worker")
+    parser.add_argument("--max-cache-files", type=int, default=256, help="DocBin files kept in the parse cache")
+    args = parser.parse_args()
+    logging.basicConfig(level=config.LOG_LEVEL, format="%(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(serve(args.host, args.port, args.socket, workers=args.workers, cache_dir=args.cache_dir,
+                          max_pending=args.max_pending, batch_delay=args.batch_delay,
+                          max_docs=args.max_docs, max_cache_files=args.max_cache_files))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,111 @@
+import numpy as np
+
+# Windows over the sentence stream (sentiment, disruption markers) and the token stream (TTR, legal terms)
+SENTENCE_WINDOW = 25
+SENTENCE_STRIDE = 5
+TOKEN_WINDOW = 500
+TOKEN_STRIDE = 100
+
+# Length-robust lexical diversity (Covington & McFall 2010; McCarthy & Jarvis 2010)
+MATTR_WINDOW = 50
+MTLD_THRESHOLD = 0.72
+
+def window_starts(n, window, stride=1):
+    """Start index of every window; a stream shorter than window yields one window covering it."""
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.arange(0, max(n - window, 0) + 1, max(stride, 1), dtype=np.int64)
+
+def window_sums(values, window, stride=1):
+    """Sum of each window from one prefix sum: O(N) however large the window."""
+    values = np.asarray(values, dtype=np.float64)
+    starts = window_starts(len(values), window, stride)
+    prefix = np.concatenate(([0.0], np.cumsum(values)))
+    return prefix[np.minimum(starts + window, len(values))] - prefix[starts]
+
+def _sizes(n, window, stride):
+    starts = window_starts(n, window, stride)
+    return np.minimum(starts + window, n) - starts
+
+def rolling_rate(events, window, stride=1):
+    """Events per item in each window (events: per-item counts or a boolean mask)."""
+    events = np.asarray(events, dtype=np.float64)
+    return window_sums(events, window, stride) / np.maximum(_sizes(len(events), window, stride), 1)
+
+def rolling_mean_std(values, window, stride=1):
+    """Rolling mean and (population) standard deviation of each window."""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.zeros(0), np.zeros(0)
+    # Centering first keeps the sum-of-squares form numerically stable
+    center = values.mean()
+    sizes = _sizes(len(values), window, stride)
+    mean = window_sums(values - center, window, stride) / sizes
+    variance = window_sums((values - center) ** 2, window, stride) / sizes - mean ** 2
+    return mean + center, np.sqrt(np.maximum(variance, 0))
+
+def previous_occurrence(token_ids):
+    """Index of the previous occurrence of each token id (-1 for a first occurrence)."""
+    token_ids = np.asarray(token_ids)
+    previous = np.full(len(token_ids), -1, dtype=np.int64)
+    order = np.argsort(token_ids, kind="stable")
+    same = token_ids[order[1:]] == token_ids[order[:-1]]
+    previous[order[1:][same]] = order[:-1][same]
+    return previous
+
+def rolling_distinct(token_ids, window, stride=1):
+    """Number of distinct token ids in each window.
+
+    A token whose previous occurrence p lies less than window positions back is a repeat
+    in every window starting in [j - window + 1, p]; those ranges are added up with one
+    difference array, so all windows cost O(N) after locating previous occurrences.
+    """
+    n = len(token_ids)
+    starts = window_starts(n, window, stride)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    window = min(window, n)
+    positions = np.arange(n)
+    previous = previous_occurrence(token_ids)
+    repeat = (previous >= 0) & (positions - previous < window)
+    first_start = np.maximum(positions[repeat] - window + 1, 0)
+    last_start = previous[repeat]
+    diff = np.bincount(first_start, minlength=n + 1) - np.bincount(last_start + 1, minlength=n + 1)
+    repeats = np.cumsum(diff)[:n]
+    return window - repeats[starts]
+
+def rolling_ttr(token_ids, window, stride=1):
+    """Type-token ratio of each window."""
+    n = len(token_ids)
+    return rolling_distinct(token_ids, window, stride) / max(min(window, n), 1)
+
+def mattr(token_ids, window=MATTR_WINDOW):
+    """Moving-average TTR: mean TTR over every window of window tokens (stride 1)."""
+    if len(token_ids) == 0:
+        return 0.0
+    return float(rolling_ttr(token_ids, window).mean())
+
+def _mtld_pass(token_ids, threshold):
+    # Running TTR over the current segment; a segment stamp on each type makes a reset O(1)
+    stamps = {}
+    factors = 0.0
+    segment = types = tokens = 0
+    for token in token_ids:
+        tokens += 1
+        if stamps.get(token) != segment:
+            stamps[token] = segment
+            types += 1
+        if types / tokens <= threshold:
+            factors += 1
+            segment += 1
+            types = tokens = 0
+    if tokens:
+        factors += (1 - types / tokens) / (1 - threshold)
+    return len(token_ids) / factors if factors else float(len(token_ids))
+
+def mtld(token_ids, threshold=MTLD_THRESHOLD):
+    """Measure of textual lexical diversity: mean of the forward and backward passes."""
+    token_ids = np.asarray(token_ids).tolist()
+    if not token_ids:
+        return 0.0
+    return (_mtld_pass(token_ids, threshold) + _mtld_pass(token_ids[::-1], threshold)) / 2
@@ -0,0 +1,78 @@
+import numpy as np
+
+ALPHA = 1
+STOP = 2
+SPACE = 4
+
+class TokenStore:
+    """Array-backed token stream for one text: a vocabulary plus int32 token ids,
+    character offsets and a per-token flag byte (ALPHA / STOP / SPACE bits)."""
+
+    def __init__(self, vocab, ids, starts, ends, flags):
+        self.vocab = vocab
+        self.vocab_index = {word: i for i, word in enumerate(vocab)}
+        self.ids = ids
+        self.starts = starts
+        self.ends = ends
+        self.flags = flags
+
+    @classmethod
+    def from_doc(cls, doc, stop_words=frozenset()):
+        from spacy.attrs import LOWER, IS_ALPHA, IS_SPACE, IDX, LENGTH
+        if len(doc) == 0:
+            empty = np.zeros(0, dtype=np.int32)
+            return cls([], empty, empty, empty.copy(), np.zeros(0, dtype=np.uint8))
+        attrs = doc.to_array([LOWER, IS_ALPHA, IDX, LENGTH, IS_SPACE])
+        hashes, ids = np.unique(attrs[:, 0], return_inverse=True)
+        vocab = [doc.vocab.strings[int(h)] for h in hashes]
+        stop_by_type = np.fromiter((w in stop_words for w in vocab), dtype=bool, count=len(vocab))
+        flags = attrs[:, 1].astype(np.uint8) * ALPHA
+        flags |= stop_by_type[ids].astype(np.uint8) * STOP
+        flags |= attrs[:, 4].astype(np.uint8) * SPACE
+        starts = attrs[:, 2].astype(np.int32)
+        return cls(vocab, ids.astype(np.int32), starts, starts + attrs[:, 3].astype(np.int32), flags)
+
+    @classmethod
+    def concat(cls, stores, offsets):
+        """Joins token streams as if their texts were concatenated: ids are re-mapped to a merged
+        vocabulary and each store's character offsets shifted by its text's offset in the joined text."""
+        vocab_index = {}
+        ids = []
+        for store in stores:
+            mapping = np.array([vocab_index.setdefault(word, len(vocab_index)) for word in store.vocab], dtype=np.int32)
+            ids.append(mapping[store.ids] if len(store) else store.ids)
+        if not ids:
+            empty = np.zeros(0, dtype=np.int32)
+            return cls([], empty, empty, empty.copy(), np.zeros(0, dtype=np.uint8))
+        return cls(list(vocab_index), np.concatenate(ids),
+                   np.concatenate([store.starts + offset for store, offset in zip(stores, offsets)]),
+                   np.concatenate([store.ends + offset for store, offset in zip(stores, offsets)]),
+                   np.concatenate([store.flags for store in stores]))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def alpha_mask(self):
+        return (self.flags & ALPHA).astype(bool)
+
+    @property
+    def stop_mask(self):
+        return (self.flags & STOP).astype(bool)
+
+    @property
+    def space_mask(self):
+        return (self.flags & SPACE).astype(bool)
+
+    @property
+    def content_mask(self):
+        return (self.flags & (ALPHA | STOP)) == ALPHA
+
+    def type_counts(self, mask=None):
+        ids = self.ids if mask is None else self.ids[mask]
+        return np.bincount(ids, minlength=len(self.vocab))
+
+    def words(self, mask=None):
+        ids = self.ids if mask is None else self.ids[mask]
+        vocab = np.asarray(self.vocab, dtype=object)
+        return vocab[ids].tolist()
@@ -0,0 +1,47 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from lexicon_matcher import LexiconMatcher, PatternMatcher
+from token_store import TokenStore
+
+spacy = pytest.importorskip("spacy")
+
+TERMS = ["burden of proof", "reasonable doubt", "beyond reasonable doubt", "court"]
+
+@pytest.fixture(scope="module")
+def nlp():
+    # The tokenizer alone decides where whitespace tokens fall, so a blank pipeline is enough
+    return spacy.blank("en")
+
+@pytest.mark.parametrize("text", [
+    "The burden of\nproof lies with the court.",
+    "The burden of  proof lies with the court.",
+    "Beyond reasonable\n\ndoubt, said the court.",
+    "Beyond   reasonable doubt,\n  said the\tcourt.",
+])
+def test_store_counts_match_text_counts_across_whitespace(nlp, text):
+    matcher = LexiconMatcher(TERMS)
+    store = TokenStore.from_doc(nlp(text))
+    assert matcher.count(store) == matcher.count(text)
+
+def test_line_wrapped_phrase_offsets_span_the_break(nlp):
+    text = "Is the burden of\nproof met?"
+    store = TokenStore.from_doc(nlp(text))
+    [(term, start, end)] = list(LexiconMatcher(["burden of proof"]).finditer(store))
+    assert term == "burden of proof"
+    assert text[start:end] == "burden of\nproof"
+
+MARKERS = (r"\.{3,}", r"…+", r"—+", r"-{2,}")
+
+@pytest.mark.parametrize("text, expected", [
+    ("I went in... and then -- nothing.", 2),
+    ("A-- I don't know. I— I can't.", 2),
+    ("It was well-known…and then----gone", 2),
+    ("No markers here - just a hyphen.", 0),
+])
+def test_pattern_matcher_counts_attached_markers(nlp, text, expected):
+    matcher = PatternMatcher(MARKERS)
+    assert matcher.count(text) == expected
+    assert matcher.count(TokenStore.from_doc(nlp(text))) == expected